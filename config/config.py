@@ -25,15 +25,96 @@ HOSPITALIZATION_KEYS = {
             'Age','Insurance Provider','Billing Amount'
 }
 
+# Source file schema: compact dtype of each column read from the CSV (other columns are ignored).
+# Low-cardinality text is read as category, small numbers as small nullable ints (a blank Age or Room
+# Number is kept as missing instead of failing the cast). Billing Amount stays float64: its string form
+# is part of the hospitalization ids, float32 would change them.
+SOURCE_SCHEMA = {
+    "Name": "object",
+    "Age": "Int8",
+    "Gender": "category",
+    "Blood Type": "category",
+    "Medical Condition": "category",
+    "Date of Admission": "datetime64[ns]",
+    "Doctor": "object",
+    "Hospital": "category",
+    "Insurance Provider": "category",
+    "Billing Amount": "float64",
+    "Room Number": "Int16",
+    "Admission Type": "category",
+    "Discharge Date": "datetime64[ns]",
+    "Medication": "category",
+    "Test Results": "category",
+}
+# Format of the date columns of the source file
+SOURCE_DATE_FORMAT = "%Y-%m-%d"
+# Cell values read as missing by both transform engines (those of pd.read_csv by default)
+SOURCE_NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
 # Directories
 DATA_DIR = Path(os.getenv("DATA_DIR", "/app/data"))
 LOG_DIR = Path(os.getenv("LOG_DIR", "./app/logs"))
 SOURCE_FILE_PATH = DATA_DIR / "healthcare_dataset.csv" 
+# Source: 'file' loads SOURCE_FILE_PATH (see LOAD_MODE), 'directory' ingests the new or changed
+# files of DATA_DIR matching INGEST_PATTERN and merges them into the collections by _id
+SOURCE_MODE = os.getenv("ETL_SOURCE_MODE", "file")
+INGEST_PATTERN = os.getenv("ETL_INGEST_PATTERN", "*.csv")
+# Processes ingesting files in parallel, each with its own MongoClient (0 = current process only)
+INGEST_WORKERS = int(os.getenv("ETL_INGEST_WORKERS", "2"))
+# Seconds between two scans of the directory (0 = a single pass)
+INGEST_WATCH_INTERVAL = int(os.getenv("ETL_INGEST_WATCH_INTERVAL", "0"))
+# Files modified less than this many seconds ago may still be copied, they wait for the next scan
+INGEST_SETTLE_SECONDS = int(os.getenv("ETL_INGEST_SETTLE_SECONDS", "5"))
+# Processed files (size, mtime, checksum, status), one document per file name
+MANIFEST_COLLECTION = "etl_manifest"
+# Run reports (JSON lines + optional Prometheus textfile), next to logs/etl_pipeline.log
+REPORT_DIR = Path(os.getenv("ETL_REPORT_DIR", "logs"))
+
+
+# PIPELINE SETTINGS ********************************************************************
+# Streaming: number of CSV rows read, cleaned and loaded at a time.
+# 0 keeps the whole file in memory (default behaviour).
+CHUNK_SIZE = int(os.getenv("ETL_CHUNK_SIZE", "0"))
+# Pipelined streaming: chunks are read, transformed and loaded concurrently (needs CHUNK_SIZE > 0),
+# by TRANSFORM_WORKERS threads, with at most PIPELINE_QUEUE_SIZE chunks waiting between two stages
+PIPELINED = os.getenv("ETL_PIPELINED", "false").lower() == "true"
+TRANSFORM_WORKERS = int(os.getenv("ETL_TRANSFORM_WORKERS", "2"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("ETL_PIPELINE_QUEUE_SIZE", "2"))
+# Streaming deduplication: 'memory' keeps the fingerprints of the rows already seen in memory,
+# 'disk' finds the duplicates beforehand with a pass over the file, its fingerprints spilled
+# into DEDUP_PARTITIONS hash partitions in DEDUP_SPILL_DIR
+DEDUP_BACKEND = os.getenv("ETL_DEDUP_BACKEND", "memory")
+DEDUP_PARTITIONS = int(os.getenv("ETL_DEDUP_PARTITIONS", "64"))
+DEDUP_SPILL_DIR = Path(os.getenv("ETL_DEDUP_SPILL_DIR", DATA_DIR / ".etl_dedup"))
+# CSV parser: 'c' or 'pyarrow' (multi-threaded, whole-file reads only, streaming always uses 'c')
+CSV_ENGINE = os.getenv("ETL_CSV_ENGINE", "c")
+# Extract + clean of whole files: 'pandas' or 'polars' (lazy and multi-threaded, same result, needs polars)
+TRANSFORM_ENGINE = os.getenv("ETL_TRANSFORM_ENGINE", "pandas")
+# Number of processes used to hash patient/hospitalization ids (0 = current process only)
+ID_HASH_WORKERS = int(os.getenv("ETL_ID_HASH_WORKERS", "0"))
+# Instrumentation: write logs/etl_pipeline.prom for the node_exporter textfile collector
+PROMETHEUS_TEXTFILE = os.getenv("ETL_PROMETHEUS_TEXTFILE", "false").lower() == "true"
+# Measure the DataFrame memory of every stage including string contents (slower)
+REPORT_DEEP_MEMORY = os.getenv("ETL_REPORT_DEEP_MEMORY", "false").lower() == "true"
+# Checkpoint of the cleaned data (Parquet), reused while the source file and the transform do not change
+CHECKPOINT_ENABLED = os.getenv("ETL_CHECKPOINT", "false").lower() == "true"
+CHECKPOINT_DIR = Path(os.getenv("ETL_CHECKPOINT_DIR", DATA_DIR / ".etl_checkpoints"))
+# Size cap of the checkpoint directory, least recently used checkpoints are evicted beyond it
+CHECKPOINT_MAX_MB = int(os.getenv("ETL_CHECKPOINT_MAX_MB", "1024"))
 
 
 # DATABASE SETTINGS ********************************************************************
 # Data modeling strategy for MongoDB
-DATA_MODELLING_MODE = "embedding" # 'embedding' or 'reference'
+DATA_MODELLING_MODE = "embedding" # 'embedding', 'reference' or 'bucket'
+# 'bucket' mode: patients keep a summary of their BUCKET_RECENT_STAYS most recent stays
+# (BUCKET_SUMMARY_FIELDS), all their stays being stored by admission date in bucket documents
+# of at most BUCKET_SIZE stays
+BUCKET_SIZE = int(os.getenv("ETL_BUCKET_SIZE", "50"))
+BUCKET_RECENT_STAYS = int(os.getenv("ETL_BUCKET_RECENT_STAYS", "3"))
+BUCKET_SUMMARY_FIELDS = ["date_of_admission", "discharge_date", "medical_condition", "hospital", "admission_type"]
 
 # Mongo credentials
 MONGO_USER = os.getenv("MONGO_USER", "root")
@@ -47,18 +128,60 @@ if _is_docker_env:
 else:
     MONGO_URI = f"mongodb://{MONGO_HOST}:{MONGO_PORT}/"
 
+# Load strategy: 'full' drops and reloads the collections,
+# 'incremental' only writes the documents whose content changed since the previous run,
+# 'staging' loads and indexes new collections, then swaps them with the live ones
+LOAD_MODE = os.getenv("ETL_LOAD_MODE", "full")
+# Suffix of the collections loaded in 'staging' mode before being renamed over the live ones
+STAGING_SUFFIX = os.getenv("ETL_STAGING_SUFFIX", "_staging")
+# Field holding the content hash of each document in 'incremental' mode
+FINGERPRINT_FIELD = "_fingerprint"
+# Number of documents (or operations) per bulk write batch
+LOAD_BATCH_SIZE = int(os.getenv("ETL_LOAD_BATCH_SIZE", "10000"))
+# Number of threads writing batches concurrently over the MongoClient connection pool
+LOAD_WORKERS = int(os.getenv("ETL_LOAD_WORKERS", "4"))
+# Write concern of the loader: number of nodes (e.g. '1') or 'majority'
+LOAD_WRITE_CONCERN = os.getenv("ETL_WRITE_CONCERN", "1")
+# Partitioned load: the inserted documents are split into LOAD_PARTITIONS partitions by a hash of
+# their _id, each partition being written by one of LOAD_PARTITION_PROCESSES worker processes with
+# its own MongoClient (0 partitions = inserts by LOAD_WORKERS threads of the current process)
+LOAD_PARTITIONS = int(os.getenv("ETL_LOAD_PARTITIONS", "0"))
+LOAD_PARTITION_PROCESSES = int(os.getenv("ETL_LOAD_PARTITION_PROCESSES", "4"))
+# Sharded cluster: the collections of the modelling mode are sharded on a hashed _id when they are
+# recreated, their empty range being pre-split into SHARD_CHUNKS_PER_SHARD chunks per shard
+# assigned to the shards in turn, so that the first writes are spread over every shard
+SHARD_PRESPLIT = os.getenv("ETL_SHARD_PRESPLIT", "false").lower() == "true"
+SHARD_CHUNKS_PER_SHARD = int(os.getenv("ETL_SHARD_CHUNKS_PER_SHARD", "2"))
+# Resumable whole-file full/staging loads: documents are written by _id order and every batch
+# written is recorded in LOAD_CHECKPOINT_COLLECTION, so that a run interrupted during the load
+# (e.g. MongoDB restart) only writes the missing batches again (best with ETL_CHECKPOINT=true)
+RESUMABLE_LOAD = os.getenv("ETL_RESUMABLE_LOAD", "false").lower() == "true"
+LOAD_CHECKPOINT_COLLECTION = "etl_load_checkpoints"
+# Processes building and BSON-encoding the documents of whole-file full/staging loads
+# (0 = built in the pipeline process and encoded by pymongo in the writer threads)
+BSON_ENCODE_WORKERS = int(os.getenv("ETL_BSON_ENCODE_WORKERS", "0"))
+
 # Target collection names
 COLLECTION_PATIENTS = "patients"
 COLLECTION_HOSPITALIZATIONS = "hospitalizations"
+COLLECTION_HOSPITALIZATION_BUCKETS = "hospitalization_buckets"
 
-TARGET_COLLECTIONS = [COLLECTION_PATIENTS, COLLECTION_HOSPITALIZATIONS]
+TARGET_COLLECTIONS = [COLLECTION_PATIENTS, COLLECTION_HOSPITALIZATIONS, COLLECTION_HOSPITALIZATION_BUCKETS]
+# Collections loaded by each modelling mode
+MODE_COLLECTIONS = {
+    "embedding": [COLLECTION_PATIENTS],
+    "reference": [COLLECTION_PATIENTS, COLLECTION_HOSPITALIZATIONS],
+    "bucket": [COLLECTION_PATIENTS, COLLECTION_HOSPITALIZATION_BUCKETS],
+}
 
 # Definition of desired indexes for each collection
 # This structure will allow us to create indexes dynamically
 INDEXES = {
     COLLECTION_PATIENTS: [
-        # Key: the field to index (in dot notation for sub-documents)
-        # Value (optional): the index type (empty for default)
+        # Either the field to index (in dot notation for sub-documents), or a dict with the
+        # "keys" of a compound index as [field, direction] pairs plus any create_index option, e.g.
+        # {"keys": [["blood_type", 1], ["name.last", 1]], "partialFilterExpression": {"blood_type": "AB-"}}
+        # (see python -m scripts.index_advisor for suggestions based on QUERY_WORKLOAD_PATH)
         "name.last",
         "blood_type"
     ],
@@ -73,3 +196,57 @@ EMBEDDING_INDEXES = {
         f"{COLLECTION_HOSPITALIZATIONS}.medical_condition"
     ]
 }
+# Specific indexes for 'bucket' mode
+BUCKET_INDEXES = {
+    COLLECTION_PATIENTS: [
+        "last_admission"
+    ],
+    COLLECTION_HOSPITALIZATION_BUCKETS: [
+        # Stays of a patient, most recent bucket first
+        {"keys": [["patient_id", 1], ["bucket", -1]]},
+        f"{COLLECTION_HOSPITALIZATIONS}.medical_condition"
+    ]
+}
+
+# Marker document rewritten at the end of every run (new run_id), so that readers caching
+# query results (scripts/patient_lookup.py) know when the loaded data changed
+RUN_MARKER_COLLECTION = "etl_runs"
+RUN_MARKER_ID = "latest"
+# Cache of PatientLookup: maximum number of cached queries, lifetime of a result (seconds)
+# and delay between two reads of the run marker (seconds)
+LOOKUP_CACHE_SIZE = int(os.getenv("ETL_LOOKUP_CACHE_SIZE", "1024"))
+LOOKUP_CACHE_TTL = float(os.getenv("ETL_LOOKUP_CACHE_TTL", "300"))
+LOOKUP_MARKER_CHECK_INTERVAL = float(os.getenv("ETL_LOOKUP_MARKER_CHECK_INTERVAL", "5"))
+
+# Representative queries of the applications, replayed with explain() by scripts/index_advisor.py
+QUERY_WORKLOAD_PATH = Path(__file__).parent / "query_workload.json"
+
+# Analytics summary collections, computed from the cleaned data and loaded in the same run
+# into "<SUMMARY_COLLECTION_PREFIX><name>", one document per group with the group value as _id.
+# Fields are the stored field names, plus 'admission_month' and 'length_of_stay_days'.
+# Metrics: field -> aggregations among 'sum', 'count', 'mean', 'min' and 'max'; every document
+# also counts its 'hospitalizations'.
+SUMMARIES_ENABLED = os.getenv("ETL_SUMMARIES", "false").lower() == "true"
+SUMMARY_COLLECTION_PREFIX = "summary_"
+SUMMARIES = {
+    "billing_by_condition": {
+        "group_by": ["medical_condition"],
+        "metrics": {"billing_amount": ["sum", "mean"]},
+    },
+    "billing_by_hospital": {
+        "group_by": ["hospital"],
+        "metrics": {"billing_amount": ["sum", "mean"]},
+    },
+    "billing_by_insurance_provider": {
+        "group_by": ["insurance_provider"],
+        "metrics": {"billing_amount": ["sum", "mean"]},
+    },
+    "admissions_by_month": {
+        "group_by": ["admission_month"],
+        "metrics": {"billing_amount": ["sum"]},
+    },
+    "length_of_stay_by_condition": {
+        "group_by": ["medical_condition"],
+        "metrics": {"length_of_stay_days": ["mean", "min", "max"]},
+    },
+}
@@ -0,0 +1,111 @@
+"""
+Parity check and benchmark of the BSON pre-encoding of documents (scripts/bson_encoder.py).
+
+The cleaned DataFrame of a CSV (a synthetic one is generated if needed) is turned into BSON by batches:
+documents built by iter_documents then encoded with bson.encode on the calling thread (what pymongo
+does in insert_many), and documents built and encoded by worker processes (encode_workers).
+Both paths must give the same bytes. A share of the cells of the CSV (--missing) is blanked first, so
+that missing values (NaN, NaT, missing ints and texts) are compared too: both paths store them as null.
+With --mongo-uri, both paths are also timed end to end through BatchLoader.insert_batches on a local mongod.
+
+Usage (from the project root):
+    python -m notebooks_and_tests.bench_bson_encoding --rows 200000 --workers 4 [--mode embedding] [--missing 0.01] [--mongo-uri mongodb://localhost:27017/]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import bson
+import numpy as np
+import pandas as pd
+
+# scripts.etl logs into logs/etl_pipeline.log as soon as it is imported
+Path("logs").mkdir(exist_ok=True)
+os.environ.setdefault("MONGO_DATABASE", "etl_benchmark")
+
+from config import config  # noqa: E402
+from scripts.loader import BatchLoader  # noqa: E402
+from notebooks_and_tests.benchmark_pipeline import BenchmarkPipeline, make_client  # noqa: E402
+from notebooks_and_tests.synthetic_data import generate  # noqa: E402
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+def write_missing_values(csv_path, output, rate, seed=7):
+    """Writes csv_path with a share rate of the cells of every column blanked."""
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    blank = np.random.default_rng(seed).random(df.shape) < rate
+    df.mask(blank, "").to_csv(output, index=False)
+
+
+def clean_frame(csv_path, client):
+    pipeline = BenchmarkPipeline(config, client)
+    return pipeline, pipeline.clean(pipeline.extract(csv_path))
+
+
+def batches_of(pipeline, df, mode, encode_workers):
+    """All the batches of iter_documents, for every collection of the mode."""
+    collections = pipeline.iter_documents(df.copy(), mode, encode_workers=encode_workers)
+    return [batch for batches in collections.values() for batch in batches]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--mode", default="embedding", choices=["embedding", "reference", "bucket"])
+    parser.add_argument("--csv", type=Path, help="Source file (default: a synthetic file of --rows rows)")
+    parser.add_argument("--missing", type=float, default=0.01, help="Share of blanked cells (0 keeps the file as is)")
+    parser.add_argument("--mongo-uri", help="Local mongod to time the inserts on")
+    args = parser.parse_args()
+
+    csv_path = args.csv or Path("data") / "benchmark" / f"synthetic_{args.rows}_0.05_0.09.csv"
+    if not csv_path.exists():
+        print(f"Generating {csv_path}...")
+        generate(csv_path, args.rows)
+
+    client, backend = make_client(args.mongo_uri)
+    if args.missing:
+        with tempfile.TemporaryDirectory() as tmp:
+            write_missing_values(csv_path, Path(tmp) / csv_path.name, args.missing)
+            pipeline, df = clean_frame(Path(tmp) / csv_path.name, client)
+        print(f"{df.isna().sum().sum()} missing values in the cleaned data")
+    else:
+        pipeline, df = clean_frame(csv_path, client)
+
+    inline, inline_time = timed(
+        "build + bson.encode (calling thread)",
+        lambda: [[bson.encode(document) for document in batch] for batch in batches_of(pipeline, df, args.mode, 0)],
+    )
+    raw, pool_time = timed(f"build + encode (w={args.workers})",
+                           lambda: batches_of(pipeline, df, args.mode, args.workers))
+    print(f"{sum(len(batch) for batch in raw)} documents in {len(raw)} batches ('{args.mode}' model)")
+
+    mismatches = sum(expected != document.raw
+                     for expected_batch, raw_batch in zip(inline, raw)
+                     for expected, document in zip(expected_batch, raw_batch))
+    if mismatches or len(inline) != len(raw):
+        print(f"❌ {mismatches} documents encoded differently")
+        raise SystemExit(1)
+    print(f"✅ Identical BSON. Wall time ratio: x{inline_time / pool_time:.1f}")
+
+    if backend == "mongod":
+        db = client[os.environ["MONGO_DATABASE"]]
+        loader = BatchLoader(db, workers=config.LOAD_WORKERS, batch_size=config.LOAD_BATCH_SIZE)
+        for label, encode_workers in [("load (dicts)", 0), (f"load (w={args.workers})", args.workers)]:
+            db.bench_bson.drop()
+            timed(label, lambda: loader.insert_batches(
+                "bench_bson", pipeline.iter_documents(df.copy(), args.mode, encode_workers=encode_workers)[config.COLLECTION_PATIENTS]))
+        db.bench_bson.drop()
+
+
+if __name__ == "__main__":
+    main()
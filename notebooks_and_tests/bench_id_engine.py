@@ -0,0 +1,78 @@
+"""
+Parity check and micro-benchmark of the batched id engine against the row-wise apply path.
+
+Usage (from the project root):
+    python -m notebooks_and_tests.bench_id_engine --rows 200000 [--workers 4] [--csv data/healthcare_dataset.csv]
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# scripts.etl logs into logs/etl_pipeline.log as soon as it is imported
+Path("logs").mkdir(exist_ok=True)
+from scripts.etl import ETLPipeline  # noqa: E402
+from scripts.id_engine import generate_hash_ids  # noqa: E402
+
+
+def synthetic_frame(rows, seed=42):
+    """A frame with the same dtypes as the cleaned healthcare data."""
+    rng = np.random.default_rng(seed)
+    names = np.array(["Brandon Johnson", "Mrs. Mary Smith", "Dr. Li Lee Jr.", "Anna Van Der Berg"])
+    return pd.DataFrame({
+        "Name": rng.choice(names, rows),
+        "Age": rng.integers(18, 90, rows),
+        "Date of Admission": pd.Timestamp("2019-01-01") + pd.to_timedelta(rng.integers(0, 2000, rows), unit="D"),
+        "Billing Amount": np.round(rng.uniform(0, 50_000, rows), 2),
+        "Room Number": rng.integers(101, 500, rows),
+        "is_billing_amount_imputed": rng.random(rows) < 0.1,
+    })
+
+
+def csv_frame(csv_path, rows):
+    df = pd.read_csv(csv_path, nrows=rows)
+    df["Date of Admission"] = pd.to_datetime(df["Date of Admission"])
+    df["Discharge Date"] = pd.to_datetime(df["Discharge Date"])
+    df["Billing Amount"] = df["Billing Amount"].abs().round(2)
+    return df
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--csv", type=Path, help="Use the first --rows rows of a real source file")
+    args = parser.parse_args()
+
+    df = csv_frame(args.csv, args.rows) if args.csv else synthetic_frame(args.rows)
+    columns = list(df.columns)
+    print(f"{len(df)} rows, key columns: {columns}")
+
+    expected, apply_time = timed(
+        "apply + _generate_hash_id",
+        lambda: df.apply(lambda row: ETLPipeline._generate_hash_id([row[col] for col in columns]), axis=1),
+    )
+    actual, engine_time = timed(
+        f"generate_hash_ids (w={args.workers})",
+        lambda: generate_hash_ids(df, columns, workers=args.workers),
+    )
+
+    mismatches = int((expected != actual).sum())
+    if mismatches:
+        print(f"❌ {mismatches} ids differ from the apply path")
+        raise SystemExit(1)
+    print(f"✅ All ids identical. Speed-up: x{apply_time / engine_time:.1f}")
+
+
+if __name__ == "__main__":
+    main()
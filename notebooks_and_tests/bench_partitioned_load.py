@@ -0,0 +1,93 @@
+"""
+Benchmark of the partitioned load (scripts/loader.py, PartitionedLoader) on a mongod or a mongos.
+
+The documents of the cleaned DataFrame of a CSV (a synthetic one is generated if needed) are inserted
+by BatchLoader (threads of the current process), then by PartitionedLoader with an increasing number
+of worker processes. Each load must write every document once; the throughput of each partition is
+printed. With --presplit (mongos only), the collection is sharded on a hashed _id and its chunks are
+spread over the shards before each load, as ETL_SHARD_PRESPLIT does.
+
+Usage (from the project root):
+    python -m notebooks_and_tests.bench_partitioned_load --mongo-uri mongodb://localhost:27017/ --rows 200000 --processes 1 2 4 [--presplit]
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+# scripts.etl logs into logs/etl_pipeline.log as soon as it is imported
+Path("logs").mkdir(exist_ok=True)
+os.environ.setdefault("MONGO_DATABASE", "etl_benchmark")
+
+from config import config  # noqa: E402
+from scripts.loader import BatchLoader, PartitionedLoader  # noqa: E402
+from scripts.sharding import presplit_hashed  # noqa: E402
+from notebooks_and_tests.benchmark_pipeline import BenchmarkPipeline, make_client  # noqa: E402
+from notebooks_and_tests.synthetic_data import generate  # noqa: E402
+
+COLLECTION = "bench_partitioned"
+
+
+def load(client, db, loader, pipeline, df, mode, presplit, chunks_per_shard):
+    """Drops the collection, loads the patients of the mode with loader, and checks the document count."""
+    db[COLLECTION].drop()
+    if presplit:
+        presplit_hashed(client, db.name, [COLLECTION], chunks_per_shard)
+    batches = pipeline.iter_documents(df.copy(), mode, encode_workers=config.BSON_ENCODE_WORKERS)[config.COLLECTION_PATIENTS]
+    start = time.perf_counter()
+    result = loader.insert_batches(COLLECTION, batches)
+    elapsed = time.perf_counter() - start
+    count = db[COLLECTION].count_documents({})
+    return result, elapsed, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongo-uri", required=True, help="mongod or mongos to load into")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--partitions", type=int, default=8)
+    parser.add_argument("--mode", default="embedding", choices=["embedding", "reference", "bucket"])
+    parser.add_argument("--csv", type=Path, help="Source file (default: a synthetic file of --rows rows)")
+    parser.add_argument("--presplit", action="store_true", help="Shard the collection on a hashed _id first (mongos)")
+    parser.add_argument("--chunks-per-shard", type=int, default=config.SHARD_CHUNKS_PER_SHARD)
+    args = parser.parse_args()
+
+    csv_path = args.csv or Path("data") / "benchmark" / f"synthetic_{args.rows}_0.05_0.09.csv"
+    if not csv_path.exists():
+        print(f"Generating {csv_path}...")
+        generate(csv_path, args.rows)
+
+    client, _ = make_client(args.mongo_uri)
+    db = client[os.environ["MONGO_DATABASE"]]
+    pipeline = BenchmarkPipeline(config, client)
+    df = pipeline.clean(pipeline.extract(csv_path))
+
+    loaders = [("threads", BatchLoader(db, workers=config.LOAD_WORKERS, batch_size=config.LOAD_BATCH_SIZE))]
+    loaders += [(f"{processes} processes", PartitionedLoader(db, args.mongo_uri, partitions=args.partitions, processes=processes,
+                                                             batch_size=config.LOAD_BATCH_SIZE))
+                for processes in args.processes]
+    failures = 0
+    print(f"\n{'loader':<16} {'documents':>10} {'seconds':>9} {'docs/s':>10}")
+    try:
+        for label, loader in loaders:
+            result, elapsed, count = load(client, db, loader, pipeline, df, args.mode, args.presplit, args.chunks_per_shard)
+            status = "✅" if count == result.inserted and not result.errors else f"❌ {count} in the collection, {len(result.errors)} errors"
+            failures += status != "✅"
+            print(f"{label:<16} {result.inserted:>10} {elapsed:9.3f} {result.inserted / elapsed:>10,.0f}  {status}")
+            if isinstance(loader, PartitionedLoader):
+                for progress in sorted(loader.report(), key=lambda progress: progress["partition"]):
+                    print(f"    partition {progress['partition']:>3} (process {progress['process']}): "
+                          f"{progress['documents']:>9} docs, {progress['docs_per_s']:>9,} docs/s")
+                loader.progress.clear()
+    finally:
+        for _, loader in loaders:
+            loader.close()
+        db[COLLECTION].drop()
+
+    if failures:
+        raise SystemExit(f"\n❌ {failures} loads did not write every document once")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark of the cached patient lookups (scripts/patient_lookup.py).
+
+A synthetic CSV is loaded (mongomock by default, a local mongod with --mongo-uri), then a skewed
+workload of lookups by _id, by last name and by blood type + medical condition is replayed
+without cache (max_size=0) and with the LRU cache. Both must return the same documents.
+The run marker is then rewritten, as run_etl does, to check that the cache is dropped.
+
+Usage (from the project root):
+    python -m notebooks_and_tests.bench_patient_lookup --rows 50000 --queries 20000 [--mode embedding] [--mongo-uri mongodb://localhost:27017/]
+"""
+import argparse
+import os
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+# scripts.etl logs into logs/etl_pipeline.log as soon as it is imported
+Path("logs").mkdir(exist_ok=True)
+os.environ.setdefault("MONGO_DATABASE", "etl_benchmark")
+
+from config import config  # noqa: E402
+from scripts.instrumentation import RunReport  # noqa: E402
+from scripts.patient_lookup import PatientLookup  # noqa: E402
+from notebooks_and_tests.benchmark_pipeline import BenchmarkPipeline, make_client  # noqa: E402
+from notebooks_and_tests.synthetic_data import generate  # noqa: E402
+
+PROJECTION = ["name", "blood_type", "gender"]
+
+
+def load(csv_path, client, mode):
+    """Loads the CSV like a full run of run_etl, run marker included."""
+    config.DATA_MODELLING_MODE = mode
+    pipeline = BenchmarkPipeline(config, client)
+    pipeline.report = RunReport(run_id=uuid.uuid4().hex)
+    df = pipeline.clean(pipeline.extract(csv_path))
+    pipeline.load(pipeline.build_documents(df, mode))
+    pipeline.ensure_indexes()
+    pipeline._write_run_marker("success")
+    return pipeline
+
+
+def workload(db, queries, seed=0):
+    """Lookups drawn with a Zipf-like skew: a few patients are asked for much more often than the others."""
+    patients = list(db[config.COLLECTION_PATIENTS].find({}, ["name.last", "blood_type"]))
+    stays_collection, condition_field = {
+        'reference': (config.COLLECTION_HOSPITALIZATIONS, "medical_condition"),
+        'bucket': (config.COLLECTION_HOSPITALIZATION_BUCKETS, f"{config.COLLECTION_HOSPITALIZATIONS}.medical_condition"),
+    }.get(config.DATA_MODELLING_MODE, (config.COLLECTION_PATIENTS, f"{config.COLLECTION_HOSPITALIZATIONS}.medical_condition"))
+    conditions = db[stays_collection].distinct(condition_field)
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.3, queries), len(patients)) - 1
+    kinds = rng.choice(3, queries, p=[0.6, 0.3, 0.1])
+    lookups = []
+    for rank, kind in zip(ranks, kinds):
+        patient = patients[rank]
+        if kind == 0:
+            lookups.append(("by_id", (patient["_id"],)))
+        elif kind == 1:
+            lookups.append(("by_last_name", (patient["name"]["last"],)))
+        else:
+            lookups.append(("by_blood_type_and_condition", (patient["blood_type"], conditions[rank % len(conditions)])))
+    return lookups
+
+
+def replay(lookup, lookups):
+    start = time.perf_counter()
+    results = [getattr(lookup, method)(*args, projection=PROJECTION) for method, args in lookups]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--mode", default="embedding", choices=["embedding", "reference", "bucket"])
+    parser.add_argument("--csv", type=Path, help="Source file (default: a synthetic file of --rows rows)")
+    parser.add_argument("--mongo-uri", help="Local mongod to query (default: mongomock)")
+    args = parser.parse_args()
+
+    csv_path = args.csv or Path("data") / "benchmark" / f"synthetic_{args.rows}_0.05_0.09.csv"
+    if not csv_path.exists():
+        print(f"Generating {csv_path}...")
+        generate(csv_path, args.rows)
+
+    client, backend = make_client(args.mongo_uri)
+    pipeline = load(csv_path, client, args.mode)
+    try:
+        lookups = workload(pipeline.db, args.queries)
+        uncached, uncached_time = replay(PatientLookup(client, max_size=0), lookups)
+        lookup = PatientLookup(client, check_interval=0)
+        cached, cached_time = replay(lookup, lookups)
+
+        print(f"{len(lookups)} lookups on {backend} ('{args.mode}' model)")
+        print(f"{'uncached':<10} {uncached_time:8.3f} s  {uncached_time / len(lookups) * 1e6:8.1f} µs/lookup")
+        print(f"{'cached':<10} {cached_time:8.3f} s  {cached_time / len(lookups) * 1e6:8.1f} µs/lookup"
+              f"  hit rate {lookup.cache.hits / len(lookups):.0%}")
+        if uncached != cached:
+            print("❌ Cached lookups returned different documents")
+            raise SystemExit(1)
+        print(f"✅ Identical results. Speedup: x{uncached_time / cached_time:.1f}")
+
+        # A new run replaces the marker: the next lookup must drop the cache
+        pipeline.report = RunReport(run_id=uuid.uuid4().hex)
+        pipeline._write_run_marker("success")
+        method, lookup_args = lookups[0]
+        getattr(lookup, method)(*lookup_args, projection=PROJECTION)
+        if len(lookup.cache) != 1:
+            print(f"❌ Cache not invalidated by the new run ({len(lookup.cache)} entries)")
+            raise SystemExit(1)
+        print("✅ Cache dropped after the new run marker")
+    finally:
+        client.drop_database(pipeline.db.name)
+
+
+if __name__ == "__main__":
+    main()
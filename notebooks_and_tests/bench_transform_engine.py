@@ -0,0 +1,118 @@
+"""
+Benchmark of the transform engines (config.TRANSFORM_ENGINE): extract + clean of the same files with
+pandas and with polars (scripts/polars_engine.py), which must give identical DataFrames (values, dtypes,
+categories, index, type of the missing values), hospitalization ids, name tables and column mappings.
+tests/test_transform_engine.py checks the same on small files, documents included.
+
+Two files are timed: a synthetic CSV (generated if needed), and a small file of edge cases derived
+from it: missing values and 'NA'/'n/a' markers, blank ages and room numbers, names with apostrophes
+and hyphens, 17-digit billing amounts next to a cent tie, exact and Age-only duplicates.
+
+Usage (from the project root):
+    python -m notebooks_and_tests.bench_transform_engine --rows 200000 [--csv data/healthcare_dataset.csv]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# scripts.etl logs into logs/etl_pipeline.log as soon as it is imported
+Path("logs").mkdir(exist_ok=True)
+os.environ.setdefault("MONGO_DATABASE", "etl_benchmark")
+
+from config import config  # noqa: E402
+from notebooks_and_tests.benchmark_pipeline import BenchmarkPipeline, make_client  # noqa: E402
+from notebooks_and_tests.synthetic_data import generate  # noqa: E402
+
+ENGINES = ["pandas", "polars"]
+
+
+def write_edge_cases(csv_path, output, rows=2000, seed=7):
+    """Writes the first rows of csv_path with edge cases injected."""
+    rng = np.random.default_rng(seed)
+    df = pd.read_csv(csv_path, nrows=rows, dtype=str)
+    picks = lambda count: rng.choice(len(df), count, replace=False)  # noqa: E731
+
+    for col in ["Name", "Gender", "Doctor", "Hospital", "Medication"]:
+        df.loc[picks(20), col] = rng.choice(["", "NA", "n/a", "NULL"], 20)
+    for col in ["Age", "Room Number"]:
+        df.loc[picks(10), col] = ""
+    df.loc[picks(10), "Name"] = ["o'NEIL mc-donald", "jEAN-luc pICARD 3rd", "dr. ÉLODIE été", "x2y z", "MARY  SMITH"] * 2
+    # Amounts half a cent from a rounding tie, written with 17 significant digits
+    amounts = np.round(rng.uniform(-1000, 50_000, 200), 3) + 0.005
+    df.loc[picks(200), "Billing Amount"] = [repr(float(amount)) for amount in amounts]
+
+    copies = df.sample(100, random_state=seed)
+    age_copies = df.sample(100, random_state=seed + 1).assign(Age=lambda frame: (frame["Age"].astype(int) + 1).astype(str))
+    pd.concat([df, copies, age_copies]).sample(frac=1, random_state=seed).to_csv(output, index=False)
+
+
+def clean_with(pipeline, engine, csv_path):
+    config.TRANSFORM_ENGINE = engine
+    start = time.perf_counter()
+    df = pipeline.extract_clean(csv_path)
+    return df, pipeline.name_table, dict(pipeline.column_mapping), time.perf_counter() - start
+
+
+def hospitalization_ids(pipeline, df):
+    return [document["_id"] for document in pipeline.build_documents(df.copy(), "reference")[config.COLLECTION_HOSPITALIZATIONS]]
+
+
+def check(pipeline, csv_path):
+    """Cleans csv_path with every engine and compares the results with the pandas ones."""
+    results = {engine: clean_with(pipeline, engine, csv_path) for engine in ENGINES}
+    expected_df, expected_names, expected_mapping, _ = results["pandas"]
+    expected_ids = hospitalization_ids(pipeline, expected_df)
+    failures = 0
+    for engine, (df, names, mapping, seconds) in results.items():
+        try:
+            pd.testing.assert_frame_equal(df, expected_df, check_exact=True, check_categorical=True)
+            # assert_frame_equal takes None for NaN: missing values must be of the same type as well
+            pd.testing.assert_frame_equal(df.map(type), expected_df.map(type))
+            assert hospitalization_ids(pipeline, df) == expected_ids, "hospitalization ids differ"
+            pd.testing.assert_frame_equal(names, expected_names, check_exact=True)
+            assert mapping == expected_mapping, f"column mappings differ: {mapping} != {expected_mapping}"
+            status = "✅"
+        except AssertionError as e:
+            failures += 1
+            status = f"❌ {str(e).splitlines()[0]}"
+        print(f"  {engine:<8} {len(df):>9} rows {seconds:8.3f} s  {status}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--csv", type=Path, help="Source file (default: a synthetic file of --rows rows)")
+    args = parser.parse_args()
+
+    csv_path = args.csv or Path("data") / "benchmark" / f"synthetic_{args.rows}_0.05_0.09.csv"
+    if not csv_path.exists():
+        print(f"Generating {csv_path}...")
+        generate(csv_path, args.rows)
+
+    client, _ = make_client(None)
+    pipeline = BenchmarkPipeline(config, client)
+    default_engine = config.TRANSFORM_ENGINE
+    failures = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            edge_cases = Path(tmp) / "edge_cases.csv"
+            write_edge_cases(csv_path, edge_cases)
+            for path in [csv_path, edge_cases]:
+                print(f"\n📊 {path}")
+                failures += check(pipeline, path)
+    finally:
+        config.TRANSFORM_ENGINE = default_engine
+
+    if failures:
+        raise SystemExit(f"\n❌ {failures} engines differ from pandas")
+    print("\n✅ Every engine gives the same cleaned data as pandas.")
+
+
+if __name__ == "__main__":
+    main()
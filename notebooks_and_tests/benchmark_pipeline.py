@@ -0,0 +1,221 @@
+"""
+Benchmark of the ETL pipeline on synthetic data.
+
+For each size, a synthetic CSV is generated once (and reused by later runs), then the benchmark times
+extract, every clean() step, build_documents and load + ensure_indexes in each modelling mode,
+then the reads of each model: a patient with its recent stays, and the full history of a patient.
+Loads go to mongomock by default, or to a real (local) mongod with --mongo-uri.
+Each run is appended to benchmark_results/results.jsonl and compared with the previous run
+of the same size and backend.
+
+Usage (from the project root):
+    python -m notebooks_and_tests.benchmark_pipeline --sizes 100k 1M [--mongo-uri mongodb://localhost:27017/]
+"""
+import argparse
+import json
+import os
+import subprocess
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+# scripts.etl logs into logs/etl_pipeline.log as soon as it is imported
+Path("logs").mkdir(exist_ok=True)
+os.environ.setdefault("MONGO_DATABASE", "etl_benchmark")
+
+import bson  # noqa: E402
+from pymongo import MongoClient  # noqa: E402
+
+from config import config  # noqa: E402
+from scripts.etl import ETLPipeline  # noqa: E402
+from scripts.instrumentation import RunReport, peak_rss_mb  # noqa: E402
+from notebooks_and_tests.synthetic_data import generate  # noqa: E402
+
+RESULTS_PATH = Path(__file__).parent / "benchmark_results" / "results.jsonl"
+MODES = ["embedding", "reference", "bucket"]
+# Patients read by each read benchmark
+READ_SAMPLE = 500
+
+
+class BenchmarkPipeline(ETLPipeline):
+    """ETLPipeline writing to a given client (mongomock or local mongod)."""
+
+    def __init__(self, config, client):
+        self._client = client
+        super().__init__(config)
+
+    def connect_to_mongo(self, uri):
+        return self._client
+
+
+def parse_size(value):
+    """'100k' → 100000, '1M' → 1000000."""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    suffix = value[-1].lower()
+    return int(float(value[:-1]) * multipliers[suffix]) if suffix in multipliers else int(value)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_client(mongo_uri):
+    if mongo_uri:
+        return MongoClient(mongo_uri), "mongod"
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("mongomock is not installed: pip install mongomock, or pass --mongo-uri")
+    return mongomock.MongoClient(), "mongomock"
+
+
+def stage_durations(report, prefix=""):
+    return {f"{prefix}{name}": round(record.duration_s, 4) for name, record in report.stages.items()}
+
+
+def _patient_view(db, mode, patient_id):
+    """A patient with the stays shown on its page: all of them (embedding, reference) or the recent summary (bucket)."""
+    patient = db[config.COLLECTION_PATIENTS].find_one({"_id": patient_id})
+    if mode == 'reference':
+        patient[config.COLLECTION_HOSPITALIZATIONS] = list(db[config.COLLECTION_HOSPITALIZATIONS].find({"patient_id": patient_id}))
+    return patient
+
+
+def _full_history(db, mode, patient_id):
+    """Every stay of a patient."""
+    if mode == 'bucket':
+        buckets = db[config.COLLECTION_HOSPITALIZATION_BUCKETS].find({"patient_id": patient_id}).sort("bucket", -1)
+        return [stay for bucket in buckets for stay in bucket[config.COLLECTION_HOSPITALIZATIONS]]
+    return _patient_view(db, mode, patient_id)[config.COLLECTION_HOSPITALIZATIONS]
+
+
+def read_benchmark(db, mode, sample=READ_SAMPLE):
+    """
+    Read cost of a model: seconds for sample patient views and full histories (patients with the
+    most stays first), and the average and maximum BSON size of the patient documents.
+    """
+    patients = db[config.COLLECTION_PATIENTS]
+    sizes = [len(bson.encode(document)) for document in patients.find()]
+    stays = Counter()
+    for document in db[config.COLLECTION_HOSPITALIZATIONS if mode == 'reference' else config.COLLECTION_PATIENTS].find():
+        if mode == 'reference':
+            stays[document["patient_id"]] += 1
+        else:
+            stays[document["_id"]] = document.get("hospitalization_count", len(document.get(config.COLLECTION_HOSPITALIZATIONS, [])))
+    patient_ids = [patient_id for patient_id, _ in stays.most_common(sample)]
+
+    timings = {}
+    for name, read in (("read_patient_view", _patient_view), ("read_full_history", _full_history)):
+        start = time.perf_counter()
+        for patient_id in patient_ids:
+            read(db, mode, patient_id)
+        timings[name] = round(time.perf_counter() - start, 4)
+    timings["patient_doc_avg_kb"] = round(sum(sizes) / max(len(sizes), 1) / 1024, 3)
+    timings["patient_doc_max_kb"] = round(max(sizes, default=0) / 1024, 3)
+    return timings
+
+
+def run_benchmark(csv_path, client, modes):
+    """Runs every stage once and returns {stage name: seconds}."""
+    pipeline = BenchmarkPipeline(config, client)
+    stages = {}
+
+    # Extract + clean (independent of the modelling mode)
+    pipeline.report = RunReport()
+    df = pipeline.clean(pipeline.extract(csv_path))
+    stages.update(stage_durations(pipeline.report))
+
+    default_mode = config.DATA_MODELLING_MODE
+    try:
+        for mode in modes:
+            # ensure_indexes reads the mode from the config
+            config.DATA_MODELLING_MODE = mode
+            pipeline.report = RunReport()
+            documents = pipeline.build_documents(df.copy(), mode)
+            with pipeline.report.stage("load"):
+                pipeline.load(documents)
+            with pipeline.report.stage("ensure_indexes"):
+                pipeline.ensure_indexes()
+            stages.update(stage_durations(pipeline.report, prefix=f"{mode}."))
+            stages.update({f"{mode}.{name}": value for name, value in read_benchmark(pipeline.db, mode).items()})
+            del documents
+    finally:
+        config.DATA_MODELLING_MODE = default_mode
+        pipeline.db.client.drop_database(pipeline.db.name)
+    return stages
+
+
+def previous_result(results_path, rows, backend):
+    if not results_path.exists():
+        return None
+    previous = None
+    with open(results_path) as f:
+        for line in f:
+            result = json.loads(line)
+            if result["rows"] == rows and result["backend"] == backend:
+                previous = result
+    return previous
+
+
+def print_comparison(result, previous):
+    print(f"\n📊 {result['rows']} rows on {result['backend']} (commit {result['git_commit']})")
+    header = f"{'stage':<44} {'seconds':>10}"
+    if previous:
+        header += f" {'previous':>10} {'delta':>8}   (commit {previous['git_commit']}, {previous['timestamp'][:10]})"
+    print(header)
+    for name, seconds in result["stages"].items():
+        line = f"{name:<44} {seconds:>10.3f}"
+        if previous and name in previous["stages"]:
+            before = previous["stages"][name]
+            delta = f"{(seconds - before) / before:+.0%}" if before else "n/a"
+            line += f" {before:>10.3f} {delta:>8}"
+        print(line)
+    print(f"{'total':<44} {result['total_s']:>10.3f}   peak RSS {result['peak_rss_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["100k"], help="Row counts, e.g. 100k 1M 10M")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--mongo-uri", help="Local mongod to load into (default: mongomock)")
+    parser.add_argument("--data-dir", type=Path, default=Path("data") / "benchmark")
+    parser.add_argument("--dup-rate", type=float, default=0.05)
+    parser.add_argument("--age-dup-rate", type=float, default=0.09)
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    client, backend = make_client(args.mongo_uri)
+    args.results.parent.mkdir(parents=True, exist_ok=True)
+
+    for size in args.sizes:
+        rows = parse_size(size)
+        csv_path = args.data_dir / f"synthetic_{rows}_{args.dup_rate}_{args.age_dup_rate}.csv"
+        if not csv_path.exists():
+            print(f"Generating {csv_path}...")
+            generate(csv_path, rows, args.dup_rate, args.age_dup_rate)
+
+        start = time.perf_counter()
+        stages = run_benchmark(csv_path, client, args.modes)
+        result = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": git_commit(),
+            "rows": rows,
+            "backend": backend,
+            "modes": args.modes,
+            "total_s": round(time.perf_counter() - start, 3),
+            "peak_rss_mb": peak_rss_mb() or 0.0,
+            "stages": stages,
+        }
+        print_comparison(result, previous_result(args.results, rows, backend))
+        with open(args.results, "a") as f:
+            f.write(json.dumps(result) + "\n")
+
+    print(f"\nResults appended to '{args.results}'.")
+
+
+if __name__ == "__main__":
+    main()
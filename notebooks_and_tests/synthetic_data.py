@@ -0,0 +1,159 @@
+"""
+Synthetic healthcare dataset generator, with the same schema as healthcare_dataset.csv.
+
+Rows are written by blocks, so that 10M-row files can be generated with little memory.
+Every row is a hospitalization of one of the generated patients (patients have several stays),
+a controllable share of rows are exact duplicates, and another share are duplicates that only
+differ by Age (the anomaly handled by the second deduplication pass).
+
+Usage (from the project root):
+    python -m notebooks_and_tests.synthetic_data --rows 1000000 --output data/synthetic_1M.csv
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = [
+    "Name", "Age", "Gender", "Blood Type", "Medical Condition", "Date of Admission", "Doctor",
+    "Hospital", "Insurance Provider", "Billing Amount", "Room Number", "Admission Type",
+    "Discharge Date", "Medication", "Test Results",
+]
+
+FIRST_NAMES = ["Bobby", "Leslie", "Danny", "Andrew", "Adrienne", "Emily", "Edward", "Christina", "Jasmine",
+               "Christopher", "Michelle", "Aaron", "Connor", "Robert", "Brooke", "Natalie", "Haley", "Kevin",
+               "Tiffany", "Mark", "Brandon", "Sarah", "Kimberly", "Jonathan", "Angela", "Joseph", "Amy"]
+LAST_NAMES = ["Jackson", "Terry", "Smith", "Watts", "Bell", "Wilson", "Johnson", "Martinez", "Allen",
+              "Garcia", "Lee", "Hernandez", "Moore", "Davis", "Williams", "Brown", "Miller", "Taylor",
+              "Anderson", "Thomas", "Harris", "Clark", "Lewis", "Robinson", "Walker", "Young", "King"]
+PREFIXES = ["Mr.", "Mrs.", "Ms.", "Miss", "Dr.", "Prof.", "Sir"]
+SUFFIXES = ["Jr.", "Sr.", "II", "III", "IV", "MD", "DDS", "DVM", "PhD", "Esq."]
+
+GENDERS = ["Male", "Female"]
+BLOOD_TYPES = ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"]
+CONDITIONS = ["Cancer", "Obesity", "Diabetes", "Asthma", "Hypertension", "Arthritis"]
+ADMISSION_TYPES = ["Urgent", "Emergency", "Elective"]
+MEDICATIONS = ["Paracetamol", "Ibuprofen", "Aspirin", "Penicillin", "Lipitor"]
+TEST_RESULTS = ["Normal", "Abnormal", "Inconclusive"]
+INSURANCE_PROVIDERS = ["Blue Cross", "Medicare", "Aetna", "UnitedHealthcare", "Cigna"]
+
+
+def _hospitals(rng, count):
+    """Company-like hospital names, e.g. 'Sons and Miller', 'Kim Inc'."""
+    first = rng.choice(LAST_NAMES, count)
+    second = rng.choice(LAST_NAMES, count)
+    patterns = rng.integers(0, 3, count)
+    return np.where(patterns == 0, np.char.add("Sons and ", second),
+                    np.where(patterns == 1, np.char.add(first, " Inc"),
+                             np.char.add(np.char.add(first, " and "), second)))
+
+
+def _messy_case(rng, names):
+    """The source file has random capitalization ('bOBby JacksOn'), fixed by str.title() in clean()."""
+    style = rng.integers(0, 4, len(names))
+    names = pd.Series(names, dtype=object)
+    names = names.where(style != 1, names.str.lower())
+    names = names.where(style != 2, names.str.upper())
+    return names.where(style != 3, names.str.swapcase()).to_numpy()
+
+
+def make_patients(rng, count):
+    """Patient identities (Name, Gender, Blood Type), some names with a title and/or a suffix."""
+    names = np.char.add(np.char.add(rng.choice(FIRST_NAMES, count), " "), rng.choice(LAST_NAMES, count))
+    # Two-word last names exist too
+    compound = rng.random(count) < 0.05
+    names = np.where(compound, np.char.add(np.char.add(names, " "), rng.choice(LAST_NAMES, count)), names)
+    with_prefix = rng.random(count) < 0.15
+    names = np.where(with_prefix, np.char.add(np.char.add(rng.choice(PREFIXES, count), " "), names), names)
+    with_suffix = rng.random(count) < 0.10
+    names = np.where(with_suffix, np.char.add(np.char.add(names, " "), rng.choice(SUFFIXES, count)), names)
+    return pd.DataFrame({
+        "Name": _messy_case(rng, names),
+        "Gender": rng.choice(GENDERS, count),
+        "Blood Type": rng.choice(BLOOD_TYPES, count),
+    })
+
+
+def make_block(rng, patients, hospitals, doctors, rows, dup_rate, age_dup_rate):
+    """One block of rows, duplicates included (duplicates copy earlier rows of the same block)."""
+    unique_rows = max(1, int(rows * (1 - dup_rate - age_dup_rate)))
+    admission = pd.Timestamp("2019-05-01") + pd.to_timedelta(rng.integers(0, 5 * 365, unique_rows), unit="D")
+    block = patients.iloc[rng.integers(0, len(patients), unique_rows)].reset_index(drop=True)
+    block = block.assign(**{
+        "Age": rng.integers(13, 90, unique_rows),
+        "Medical Condition": rng.choice(CONDITIONS, unique_rows),
+        "Date of Admission": admission.strftime("%Y-%m-%d"),
+        "Doctor": rng.choice(doctors, unique_rows),
+        "Hospital": rng.choice(hospitals, unique_rows),
+        "Insurance Provider": rng.choice(INSURANCE_PROVIDERS, unique_rows),
+        # About 0.2% of the amounts are negative (and small) in the source file
+        "Billing Amount": np.where(rng.random(unique_rows) < 0.002, -rng.uniform(0, 2_000, unique_rows),
+                                   rng.uniform(9, 52_800, unique_rows)),
+        "Room Number": rng.integers(101, 501, unique_rows),
+        "Admission Type": rng.choice(ADMISSION_TYPES, unique_rows),
+        "Discharge Date": (admission + pd.to_timedelta(rng.integers(1, 31, unique_rows), unit="D")).strftime("%Y-%m-%d"),
+        "Medication": rng.choice(MEDICATIONS, unique_rows),
+        "Test Results": rng.choice(TEST_RESULTS, unique_rows),
+    })
+
+    duplicates = block.iloc[rng.integers(0, unique_rows, int(rows * dup_rate))]
+    age_duplicates = block.iloc[rng.integers(0, unique_rows, rows - unique_rows - len(duplicates))].copy()
+    age_duplicates["Age"] = (age_duplicates["Age"] + rng.integers(1, 5, len(age_duplicates))).clip(upper=99)
+
+    block = pd.concat([block, duplicates, age_duplicates], ignore_index=True)
+    return block.iloc[rng.permutation(len(block))][COLUMNS]
+
+
+def generate(output, rows, dup_rate=0.05, age_dup_rate=0.09, stays_per_patient=1.2, block_size=500_000, seed=42):
+    """
+    Writes a synthetic CSV of `rows` rows.
+
+    Args:
+        output (Path): Destination file.
+        rows (int): Number of rows, duplicates included.
+        dup_rate (float): Share of rows that are exact copies of another row.
+        age_dup_rate (float): Share of rows that are copies of another row with a different Age.
+        stays_per_patient (float): Average number of hospitalizations per patient.
+        block_size (int): Rows generated and written at a time.
+        seed (int): Random seed, the same arguments always give the same file.
+    """
+    if dup_rate + age_dup_rate >= 1:
+        raise ValueError("dup_rate + age_dup_rate must be lower than 1")
+
+    rng = np.random.default_rng(seed)
+    patients = make_patients(rng, max(1, int(rows / stays_per_patient)))
+    hospitals = _hospitals(rng, max(10, rows // 50))
+    doctors = np.char.add(np.char.add(rng.choice(FIRST_NAMES, max(10, rows // 20)), " "),
+                          rng.choice(LAST_NAMES, max(10, rows // 20)))
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    while written < rows:
+        block_rows = min(block_size, rows - written)
+        block = make_block(rng, patients, hospitals, doctors, block_rows, dup_rate, age_dup_rate)
+        block.to_csv(output, mode="w" if written == 0 else "a", header=written == 0, index=False)
+        written += block_rows
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--dup-rate", type=float, default=0.05, help="Share of exact duplicate rows")
+    parser.add_argument("--age-dup-rate", type=float, default=0.09, help="Share of rows duplicated with another Age")
+    parser.add_argument("--stays-per-patient", type=float, default=1.2)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generate(args.output, args.rows, args.dup_rate, args.age_dup_rate, args.stays_per_patient, seed=args.seed)
+    size_mb = args.output.stat().st_size / 1_048_576
+    print(f"✅ {args.rows} rows written to '{args.output}' ({size_mb:.1f} MB) in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
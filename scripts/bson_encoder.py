@@ -0,0 +1,79 @@
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import bson
+from bson.raw_bson import RawBSONDocument
+
+from scripts.documents import patient_documents, hospitalization_documents, bucket_patient_documents, bucket_documents
+
+logger = logging.getLogger(__name__)
+
+# Parsed names, sent once to each worker process rather than with every batch
+_name_table = None
+
+
+def _init_worker(name_table):
+    global _name_table
+    _name_table = name_table
+
+
+def encode_patients(df_patient, hospitalizations, counts, embedded_field):
+    """Builds and encodes a batch of patient documents (runs in a worker process)."""
+    patients = patient_documents(df_patient, _name_table, hospitalizations, counts, embedded_field)
+    return [bson.encode(patient) for patient in patients]
+
+
+def encode_hospitalizations(df_hosp):
+    """Builds and encodes a batch of hospitalization documents (runs in a worker process)."""
+    return [bson.encode(hospitalization) for hospitalization in hospitalization_documents(df_hosp)]
+
+
+def encode_bucket_patients(df_patient, hospitalizations, counts, date_field, recent, summary_fields):
+    """Builds and encodes a batch of 'bucket' mode patient documents (runs in a worker process)."""
+    patients = bucket_patient_documents(df_patient, _name_table, hospitalizations, counts,
+                                        date_field, recent, summary_fields)
+    return [bson.encode(patient) for patient in patients]
+
+
+def encode_buckets(patient_ids, hospitalizations, counts, date_field, bucket_size, embedded_field):
+    """Builds and encodes the bucket documents of a batch of patients (runs in a worker process)."""
+    buckets = bucket_documents(patient_ids, hospitalizations, counts, date_field, bucket_size, embedded_field)
+    return [bson.encode(bucket) for bucket in buckets]
+
+
+class BsonEncoder:
+    """
+    Builds and encodes batches of documents into RawBSONDocument in a pool of processes, so that
+    the loader threads only send already encoded buffers instead of building and encoding dicts
+    while holding the GIL. Workers receive the DataFrame slices of each batch, which are much
+    cheaper to send to another process than the documents themselves.
+    """
+
+    def __init__(self, workers, name_table=None):
+        self.workers = max(1, workers)
+        self.name_table = name_table
+
+    def encode(self, function, slices):
+        """
+        Runs function(*batch_slices) for each item of slices in the pool, lazily and in order,
+        with at most 2 batches per worker being encoded ahead of the consumer.
+
+        Yields:
+            Lists of RawBSONDocument, one per batch.
+        """
+        # 'spawn': the loader threads and the pymongo client of the parent must not be inherited by the workers
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"), initializer=_init_worker,
+                                 initargs=(self.name_table,)) as executor:
+            pending = deque()
+            for batch_slices in slices:
+                pending.append(executor.submit(function, *batch_slices))
+                if len(pending) >= 2 * self.workers:
+                    yield self._raw_documents(pending.popleft().result())
+            while pending:
+                yield self._raw_documents(pending.popleft().result())
+
+    @staticmethod
+    def _raw_documents(encoded_batch):
+        return [RawBSONDocument(data) for data in encoded_batch]
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Bump when ETLPipeline.clean() changes, so that older checkpoints are not reused
+TRANSFORM_VERSION = 2
+
+_MAPPING_METADATA_KEY = b"etl_column_mapping"
+
+
+def transform_signature():
+    """Hash of the transform version and of the config values the cleaning depends on."""
+    settings = {
+        "version": TRANSFORM_VERSION,
+        "patient_keys": sorted(config.PATIENT_KEYS),
+        "hospitalization_keys": sorted(config.HOSPITALIZATION_KEYS),
+        "name_prefixes": sorted(config.NAME_PREFIXES),
+        "name_suffixes": sorted(config.NAME_SUFFIXES),
+        "source_schema": config.SOURCE_SCHEMA,
+        "source_date_format": config.SOURCE_DATE_FORMAT,
+        "source_na_values": sorted(config.SOURCE_NA_VALUES),
+    }
+    return hashlib.sha256(json.dumps(settings).encode()).hexdigest()[:16]
+
+
+def file_checksum(path, block_size=1 << 20):
+    """sha256 of a file, read by blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TransformCache:
+    """
+    Parquet checkpoints of the cleaned, ID-stamped DataFrame, keyed by the checksum of the
+    source file and the transform signature. The least recently used checkpoints are evicted
+    once the cache grows over max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def key(self, csv_path):
+        return f"{file_checksum(csv_path)[:32]}-{transform_signature()}"
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.parquet"
+
+    def load(self, key):
+        """
+        Returns:
+            (DataFrame, column_mapping) of the checkpoint, or None when there is none for this key.
+        """
+        path = self._path(key)
+        if not path.exists():
+            logger.info(f"No checkpoint found for key {key}.")
+            return None
+
+        table = pq.read_table(path)
+        column_mapping = json.loads(table.schema.metadata[_MAPPING_METADATA_KEY])
+        df = table.to_pandas()
+        # Mark as recently used for eviction
+        os.utime(path)
+        logger.info(f"✅ Checkpoint loaded from '{path}': {len(df)} rows, extract and cleaning skipped.")
+        return df, column_mapping
+
+    def save(self, key, df, column_mapping):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = {**(table.schema.metadata or {}), _MAPPING_METADATA_KEY: json.dumps(column_mapping).encode()}
+        table = table.replace_schema_metadata(metadata)
+
+        # Written aside then renamed, so that an interrupted run never leaves a truncated checkpoint
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        logger.info(f"Checkpoint saved to '{path}' ({path.stat().st_size / 1_048_576:.2f} MB).")
+
+        self._evict(keep=path)
+
+    def _evict(self, keep):
+        """Deletes the least recently used checkpoints until the cache fits in max_bytes."""
+        checkpoints = sorted(self.cache_dir.glob("*.parquet"), key=lambda p: p.stat().st_mtime)
+        total_bytes = sum(p.stat().st_size for p in checkpoints)
+        for path in checkpoints:
+            if total_bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total_bytes -= path.stat().st_size
+            path.unlink()
+            logger.info(f"   ➖ Checkpoint evicted: '{path.name}'")
+
+
+class LoadCheckpoint:
+    """
+    Batches written by a resumable load, one document per collection in the checkpoint collection:
+    {_id: collection name, load_key, batches: {batch number: documents}}. The load key identifies
+    the cleaned data and the batching, a run resumes only the interrupted load of the same key.
+    """
+
+    def __init__(self, collection, load_key):
+        self.collection = collection
+        self.load_key = load_key
+
+    def committed(self, collection_name, current_count):
+        """
+        Returns:
+            The sizes of the batches already written into collection_name by an interrupted run of
+            the same load, by batch number, or None when there is nothing to resume.
+        """
+        entry = self.collection.find_one({"_id": collection_name})
+        if entry is None or entry["load_key"] != self.load_key:
+            return None
+        batches = {int(number): size for number, size in entry["batches"].items()}
+        if current_count < sum(batches.values()):
+            logger.warning(f"⚠️ '{collection_name}' has fewer documents than its checkpoint, the load starts over.")
+            return None
+        return batches
+
+    def start(self, collection_name):
+        self.collection.replace_one({"_id": collection_name}, {"load_key": self.load_key, "batches": {}}, upsert=True)
+
+    def commit(self, collection_name, batch_number, size):
+        self.collection.update_one({"_id": collection_name}, {"$set": {f"batches.{batch_number}": size}})
+
+    def clear(self):
+        """Forgets the load once it is complete."""
+        self.collection.delete_many({})
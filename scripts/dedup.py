@@ -0,0 +1,109 @@
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# One spilled fingerprint: source row number and 128-bit hash
+RECORD_DTYPE = np.dtype([("row", "<u8"), ("hi", "<u8"), ("lo", "<u8")])
+
+
+class ExternalDeduplicator:
+    """
+    Finds duplicated rows of a file larger than memory, keeping the first occurrence like
+    DataFrame.drop_duplicates(). Row fingerprints are appended to hash partitions on disk as
+    chunks are read, then each partition is deduplicated on its own: all the copies of a row
+    land in the same partition, so a partition only needs its own fingerprints.
+
+    Several levels can be chained, each one only considering the rows kept by the previous
+    levels (e.g. full rows, then the key columns without Age).
+
+        with ExternalDeduplicator(spill_dir, levels=2) as dedup:
+            for chunk in chunks:
+                dedup.add(0, chunk.index, full_row_fingerprints)
+                dedup.add(1, chunk.index, key_fingerprints)
+            keep = dedup.keep_mask()
+    """
+
+    def __init__(self, spill_dir, partitions=64, levels=1):
+        self.spill_dir = Path(spill_dir)
+        self.partitions = max(1, partitions)
+        self.levels = levels
+        self.rows = 0
+        self._dir = None
+        self._files = {}
+
+    def __enter__(self):
+        self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._dir = Path(tempfile.mkdtemp(prefix="dedup_", dir=self.spill_dir))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._close_files()
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+    def _path(self, level, partition):
+        return self._dir / f"level{level}_part{partition:04d}.bin"
+
+    def _close_files(self):
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def add(self, level, row_numbers, fingerprints):
+        """
+        Spills the fingerprints of a chunk.
+
+        Args:
+            level (int): Deduplication level, from 0.
+            row_numbers: Position of each row in the whole file.
+            fingerprints (np.ndarray): (rows, 2) uint64 array, the 128-bit hash of each row.
+        """
+        records = np.empty(len(row_numbers), dtype=RECORD_DTYPE)
+        records["row"] = row_numbers
+        records["hi"] = fingerprints[:, 0]
+        records["lo"] = fingerprints[:, 1]
+        if len(records):
+            self.rows = max(self.rows, int(records["row"].max()) + 1)
+
+        partitions = records["hi"] % self.partitions
+        order = np.argsort(partitions, kind="stable")
+        bounds = np.searchsorted(partitions[order], np.arange(self.partitions + 1))
+        for partition in range(self.partitions):
+            if bounds[partition] == bounds[partition + 1]:
+                continue
+            key = (level, partition)
+            if key not in self._files:
+                self._files[key] = open(self._path(level, partition), "ab")
+            records[order[bounds[partition]:bounds[partition + 1]]].tofile(self._files[key])
+
+    def keep_mask(self):
+        """
+        Deduplicates every partition, level by level.
+
+        Returns:
+            A boolean array indexed by row number, False for the rows to drop.
+        """
+        self._close_files()
+        keep = np.ones(self.rows, dtype=bool)
+        for level in range(self.levels):
+            dropped = 0
+            for partition in range(self.partitions):
+                path = self._path(level, partition)
+                if not path.exists():
+                    continue
+                records = np.fromfile(path, dtype=RECORD_DTYPE)
+                # Rows dropped by a previous level do not hide later copies
+                records = records[keep[records["row"]]]
+                # Sorted by fingerprint, then row number: the first row of each group is its first occurrence
+                records = records[np.lexsort((records["row"], records["lo"], records["hi"]))]
+                duplicate = np.zeros(len(records), dtype=bool)
+                duplicate[1:] = (records["hi"][1:] == records["hi"][:-1]) & (records["lo"][1:] == records["lo"][:-1])
+                keep[records["row"][duplicate]] = False
+                dropped += int(duplicate.sum())
+                path.unlink()
+            logger.info(f"   Deduplication level {level}: {dropped} duplicated rows out of {self.rows}.")
+        return keep
@@ -0,0 +1,116 @@
+import numpy as np
+
+from scripts.name_parser import name_documents
+
+
+def with_nulls(frame):
+    """
+    Replaces missing values (NaN, NaT) by None in the columns that have some, so that they are
+    stored as null: BSON would store NaN as a double and cannot encode NaT at all.
+    Timestamps need no conversion, they are encoded as datetimes (millisecond precision).
+    """
+    if frame is None:
+        return None
+    missing = frame.isna().any()
+    columns = missing.index[missing.to_numpy()]
+    if len(columns):
+        frame = frame.copy()
+        for column in columns:
+            values = frame[column].astype(object)
+            frame[column] = values.where(values.notna(), None)
+    return frame
+
+
+def patient_documents(df_patient, name_table=None, hospitalizations=None, counts=None, embedded_field=None):
+    """
+    Builds the documents of a batch of patients (see ETLPipeline.iter_documents).
+
+    Args:
+        df_patient (pd.DataFrame): One row per patient: 'patient_id', categorical 'name' and the patient keys.
+        name_table (pd.DataFrame, optional): Parsed names of the 'name' categories (parse_name_table).
+        hospitalizations (pd.DataFrame, optional): 'embedding' mode, the stays of these patients,
+            grouped by patient in the same order.
+        counts (list, optional): Number of hospitalization rows of each patient.
+        embedded_field (str, optional): Field receiving the embedded hospitalizations.
+
+    Returns:
+        A list of patient documents, '_id' first.
+    """
+    df_patient = df_patient.assign(name=name_documents(df_patient["name"], name_table))  # inject parsed names
+    patients = with_nulls(df_patient).rename(columns={"patient_id": "_id"}).to_dict(orient="records")
+
+    if hospitalizations is not None:
+        records = with_nulls(hospitalizations).to_dict(orient="records")
+        offset = 0
+        for patient, count in zip(patients, counts):
+            patient[embedded_field] = records[offset:offset + count]
+            offset += count
+    return patients
+
+
+def hospitalization_documents(df_hosp):
+    """Builds the documents of a batch of hospitalizations ('reference' mode), '_id' first."""
+    return with_nulls(df_hosp).rename(columns={"hospitalization_id": "_id"}).to_dict(orient="records")
+
+
+def _stays_by_admission(hospitalizations, counts, date_field):
+    """Stays of a batch grouped by patient as given by counts, each patient's stays sorted by admission date."""
+    patient = np.repeat(np.arange(len(counts)), counts)
+    # lexsort is stable: stays admitted the same day keep the source order
+    return hospitalizations.iloc[np.lexsort((hospitalizations[date_field].to_numpy(), patient))]
+
+
+def bucket_patient_documents(df_patient, name_table, hospitalizations, counts, date_field, recent, summary_fields):
+    """
+    Builds the patient documents of a batch in 'bucket' mode: the stays are not embedded, only
+    their number, the last admission date and a summary of the most recent ones (newest first).
+
+    Args:
+        df_patient, name_table: As for patient_documents.
+        hospitalizations (pd.DataFrame): The stays of these patients, grouped by patient in the same order.
+        counts (list): Number of stays of each patient.
+        date_field (str): Admission date column.
+        recent (int): Number of stays in the summary.
+        summary_fields (list): Columns of the summarized stays.
+
+    Returns:
+        A list of patient documents, '_id' first.
+    """
+    patients = patient_documents(df_patient, name_table)
+    records = with_nulls(_stays_by_admission(hospitalizations[summary_fields], counts, date_field)).to_dict(orient="records")
+    offset = 0
+    for patient, count in zip(patients, counts):
+        stays = records[offset:offset + count]
+        offset += count
+        patient["hospitalization_count"] = count
+        patient["last_admission"] = stays[-1][date_field] if stays else None
+        patient["recent_hospitalizations"] = stays[::-1][:recent]
+    return patients
+
+
+def bucket_documents(patient_ids, hospitalizations, counts, date_field, bucket_size, embedded_field):
+    """
+    Builds the bucket documents of a batch of patients ('bucket' mode): the stays of each patient,
+    sorted by admission date, split into buckets of at most bucket_size stays. Bucket 0 holds the
+    oldest stays, and each bucket knows the admission dates it spans.
+
+    Returns:
+        A list of bucket documents, with '<patient_id>_<bucket number>' as _id.
+    """
+    records = with_nulls(_stays_by_admission(hospitalizations, counts, date_field)).to_dict(orient="records")
+    buckets = []
+    offset = 0
+    for patient_id, count in zip(patient_ids, counts):
+        for number, start in enumerate(range(0, count, bucket_size)):
+            stays = records[offset + start:offset + min(start + bucket_size, count)]
+            buckets.append({
+                "_id": f"{patient_id}_{number:04d}",
+                "patient_id": patient_id,
+                "bucket": number,
+                "count": len(stays),
+                "first_admission": stays[0][date_field],
+                "last_admission": stays[-1][date_field],
+                embedded_field: stays,
+            })
+        offset += count
+    return buckets
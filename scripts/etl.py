@@ -5,10 +5,27 @@ from pathlib import Path
 import logging
 from typing import List, Dict, Any
 import os
-from datetime import datetime
+import time
+import uuid
+from datetime import datetime, timezone
 from config import config
+from scripts.id_engine import generate_hash_ids
+from scripts.name_parser import parse_name_table
+from scripts.documents import patient_documents, hospitalization_documents, bucket_patient_documents, bucket_documents
+from scripts.bson_encoder import BsonEncoder, encode_patients, encode_hospitalizations, encode_bucket_patients, encode_buckets
+from scripts.loader import BatchLoader, PartitionedLoader, batched
+from scripts.checkpoint import TransformCache, LoadCheckpoint
+from scripts.instrumentation import RunReport
+from scripts.pipelining import StageRunner, Turnstile, END
+from scripts.dedup import ExternalDeduplicator
+from scripts.summaries import SummaryBuilder
+from scripts.ingest import DirectoryIngestor, ingest_in_worker
+from scripts.sharding import presplit_hashed
 import hashlib
-from collections import defaultdict
+from dataclasses import dataclass, field
+import numpy as np
+from pymongo import InsertOne, UpdateOne, ReplaceOne, DeleteOne, IndexModel, ASCENDING
+import bson
 
 #Configuraiton des logs
 logging.basicConfig(
@@ -22,6 +39,18 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class StreamState:
+    """Cross-chunk state kept while streaming the source file chunk by chunk."""
+    # Fingerprints of the rows kept by each deduplication pass
+    seen_rows: set = field(default_factory=set)
+    seen_hospitalizations: set = field(default_factory=set)
+    # 'disk' dedup backend: rows to keep, indexed by row number, found by a first pass over the file
+    keep: np.ndarray = None
+    # Patients already written to MongoDB
+    seen_patients: set = field(default_factory=set)
+
+
 class ETLPipeline:
     def __init__(self, config):
         # MongoDB credentials
@@ -36,8 +65,46 @@ class ETLPipeline:
 
         self.mongo_client = self.connect_to_mongo(mongo_uri)
         self.db = self.mongo_client[mongo_database]
+        if config.LOAD_PARTITIONS > 0:
+            # Inserts spread by hashed _id over worker processes, each with its own client
+            self.loader = PartitionedLoader(
+                self.db,
+                mongo_uri,
+                partitions=config.LOAD_PARTITIONS,
+                processes=config.LOAD_PARTITION_PROCESSES,
+                workers=config.LOAD_WORKERS,
+                batch_size=config.LOAD_BATCH_SIZE,
+                write_concern=config.LOAD_WRITE_CONCERN,
+            )
+        else:
+            # Batched writers sharing the client connection pool
+            self.loader = BatchLoader(
+                self.db,
+                workers=config.LOAD_WORKERS,
+                batch_size=config.LOAD_BATCH_SIZE,
+                write_concern=config.LOAD_WRITE_CONCERN,
+            )
         
         self.column_mapping = {}
+        # Parsed distinct names of the last cleaned DataFrame
+        self.name_table = None
+
+        # Per-stage timings and memory, renewed by each run_etl
+        self.report = RunReport()
+
+        # Collection actually written for each target collection ('staging' load mode),
+        # with the documents inserted and the write errors of the current run
+        self.collection_names = {}
+        self.loaded_counts = {}
+        self.write_error_count = 0
+
+        # Analytics rollups of the current run (config.SUMMARIES_ENABLED)
+        self.summaries = None
+
+        # Key of the transform checkpoint of the last cached_clean, and batches written by a
+        # resumable load (config.RESUMABLE_LOAD)
+        self.transform_key = None
+        self.load_checkpoint = None
 
         # Tracking state
         self._last_rows = None
@@ -77,6 +144,7 @@ class ETLPipeline:
         self._last_rows = current_rows
         self._last_cols = current_cols
 
+    # Reference implementation for a single name, see scripts/name_parser.py for the batched version
     @staticmethod
     def _parse_name(full_name: str):
         parts = full_name.split()
@@ -100,6 +168,46 @@ class ETLPipeline:
     def _generate_hash_id(values, len=20):
         concat = "|".join(str(v) for v in values)
         return hashlib.sha256(concat.encode()).hexdigest()[:len]
+
+    @staticmethod
+    def _row_fingerprints(df, subset=None, hash_key=None):
+        """64-bit hash of each row (or of the given subset of columns), ignoring the index."""
+        columns = sorted(subset) if subset is not None else list(df.columns)
+        frame = df[columns]
+        # drop_duplicates considers 5 == 5.0, but the hashes differ: a column can be inferred
+        # as int in one chunk and float in another, so numbers are hashed as float64.
+        numeric_columns = frame.select_dtypes(include="number").columns
+        if len(numeric_columns):
+            frame = frame.astype({col: "float64" for col in numeric_columns})
+        if hash_key is None:
+            return pd.util.hash_pandas_object(frame, index=False)
+        return pd.util.hash_pandas_object(frame, index=False, hash_key=hash_key)
+
+    def _row_fingerprints128(self, df, subset=None):
+        """128-bit hash of each row, as a (rows, 2) uint64 array: two 64-bit hashes with different keys."""
+        return np.column_stack([
+            self._row_fingerprints(df, subset).to_numpy(),
+            self._row_fingerprints(df, subset, hash_key="etl-dedup-key-02").to_numpy(),
+        ])
+
+    def _drop_duplicates(self, df, subset=None, seen=None):
+        """
+        drop_duplicates() with an optional memory of the rows kept in previous chunks.
+        When 'seen' is given, rows already met in an earlier chunk are dropped too, so that
+        the first occurrence in the whole file wins, exactly like the in-memory path.
+        """
+        if seen is None:
+            return df.drop_duplicates(subset=subset)
+
+        return df[self._first_seen(self._row_fingerprints(df, subset), seen)]
+
+    @staticmethod
+    def _first_seen(fingerprints, seen):
+        """Mask of the rows met for the first time, in this chunk and in the previous ones (added to 'seen')."""
+        seen_before = np.fromiter((fp in seen for fp in fingerprints.tolist()), dtype=bool, count=len(fingerprints))
+        keep = ~fingerprints.duplicated().to_numpy() & ~seen_before
+        seen.update(fingerprints[keep].tolist())
+        return keep
     
     def normalize_column_names(self, df):
         logger.info("Starting column normalization...")
@@ -131,47 +239,59 @@ class ETLPipeline:
         logger.info(f"✅ Column normalization complete: {len(original_columns)} columns renamed")
         return df
     
+    def _collection_name(self, name):
+        """Name of the collection written for a target collection (its staging copy in 'staging' mode)."""
+        return self.collection_names.get(name, name)
+
     def ensure_indexes(self):
         """
         Ensures that the necessary indexes are created for the chosen data model,
         based entirely on the central configuration.
+        The indexes of each collection are built together, with a single create_indexes command.
         """
         mode = config.DATA_MODELLING_MODE
         logger.info(f"Ensuring indexes for '{mode}' model...")
 
         # --- Base indexes for the 'patients' collection (common to both modes) ---
         patients_collection_name = config.COLLECTION_PATIENTS
-        if patients_collection_name in self.db.list_collection_names():
-            patients_collection = self.db[patients_collection_name]
-            
-            # Create indexes defined in the main INDEXES dictionary
-            for index_key in config.INDEXES.get(patients_collection_name, []):
-                logger.info(f"  Creating index on '{patients_collection_name}.{index_key}'...")
-                patients_collection.create_index(index_key)
-        
+        index_keys = {patients_collection_name: list(config.INDEXES.get(patients_collection_name, []))}
+
         # --- Mode-specific indexes ---
         if mode == 'reference':
             hospitalizations_collection_name = config.COLLECTION_HOSPITALIZATIONS
-            if hospitalizations_collection_name in self.db.list_collection_names():
-                hosp_collection = self.db[hospitalizations_collection_name]
-                
-                # Create indexes for the hospitalizations collection
-                for index_key in config.INDEXES.get(hospitalizations_collection_name, []):
-                    logger.info(f"  Creating index on '{hospitalizations_collection_name}.{index_key}'...")
-                    hosp_collection.create_index(index_key)
-
+            index_keys[hospitalizations_collection_name] = list(config.INDEXES.get(hospitalizations_collection_name, []))
         elif mode == 'embedding':
             # In embedding mode, we add extra indexes to the patients collection
-            if patients_collection_name in self.db.list_collection_names():
-                patients_collection = self.db[patients_collection_name]
+            index_keys[patients_collection_name] += config.EMBEDDING_INDEXES.get(patients_collection_name, [])
+        elif mode == 'bucket':
+            for collection_name, specs in config.BUCKET_INDEXES.items():
+                index_keys.setdefault(collection_name, []).extend(specs)
 
-                # Create indexes specific to the embedding model
-                for index_key in config.EMBEDDING_INDEXES.get(patients_collection_name, []):
-                    logger.info(f"  Creating embedding-specific index on '{patients_collection_name}.{index_key}'...")
-                    patients_collection.create_index(index_key)
+        existing_collections = set(self.db.list_collection_names())
+        for collection_name, specs in index_keys.items():
+            target_name = self._collection_name(collection_name)
+            if not specs or target_name not in existing_collections:
+                continue
+            models = [self._index_model(spec) for spec in specs]
+            for model in models:
+                logger.info(f"  Creating index {dict(model.document['key'])} on '{target_name}'...")
+            with self.report.stage(f"create_index_{collection_name}"):
+                self.db[target_name].create_indexes(models)
 
         logger.info("⚙️ All indexes are set.")
 
+    @staticmethod
+    def _index_model(spec):
+        """
+        IndexModel of an entry of config.INDEXES: a field name, or a dict with the "keys" of a
+        compound index ([field, direction] pairs, or field names for ascending keys) and create_index options.
+        """
+        if isinstance(spec, str):
+            return IndexModel(spec)
+        options = dict(spec)
+        keys = [(key, ASCENDING) if isinstance(key, str) else tuple(key) for key in options.pop("keys")]
+        return IndexModel(keys, **options)
+
     def clear_collections(self, collection_names):
         """Drops specified collections to ensure a clean slate before loading."""
         logger.info("Clearing target collections ...")
@@ -179,6 +299,12 @@ class ETLPipeline:
             logger.info(f"   ➖ Dropping collection: '{name}' ...")
             self.db[name].drop()
         logger.info("✅ Collections cleared successfully.")
+        if config.SHARD_PRESPLIT:
+            # Recreated sharded on a hashed _id, with chunks already spread over the shards
+            mode_collections = {self._collection_name(name) for name in config.MODE_COLLECTIONS.get(config.DATA_MODELLING_MODE, [])}
+            logger.info("Pre-splitting the sharded target collections ...")
+            presplit_hashed(self.mongo_client, self.db.name, [name for name in collection_names if name in mode_collections],
+                            config.SHARD_CHUNKS_PER_SHARD)
     
     def build_documents(self, df, mode):
         """
@@ -187,116 +313,411 @@ class ETLPipeline:
 
         Args:
             df (pd.DataFrame): The transformed and normalized DataFrame.
-            mode (str): The modeling strategy ('embedding' or 'reference').
+            mode (str): The modeling strategy ('embedding', 'reference' or 'bucket').
 
         Returns:
             A dictionary where keys are collection names and values are lists of documents.
         """
+        return {
+            collection_name: [document for batch in batches for document in batch]
+            for collection_name, batches in self.iter_documents(df, mode).items()
+        }
+
+    def iter_documents(self, df, mode, batch_size=None, encode_workers=0, order_by_id=False, skip=None):
+        """
+        Lazily transforms a clean DataFrame into structured documents, batch by batch, so that
+        only one batch of documents is held in memory and loading can start with the first one.
+        Rows are grouped by patient once (stable sort of the patient codes), patients keep the
+        order of their first appearance and their hospitalizations the order of the source file.
+
+        Args:
+            df (pd.DataFrame): The transformed and normalized DataFrame.
+            mode (str): The modeling strategy ('embedding', 'reference' or 'bucket').
+            batch_size (int, optional): Documents per batch, config.LOAD_BATCH_SIZE by default.
+            encode_workers (int, optional): When > 0, batches are built and encoded to BSON by this
+                number of processes, and yielded as lists of RawBSONDocument.
+            order_by_id (bool, optional): Documents of each collection sorted by _id instead, so
+                that every batch holds the same documents from one run to the next (resumable load).
+            skip (dict, optional): Numbers (from 1) of the batches of each collection to leave out, e.g.
+                those written by the interrupted load being resumed: they are neither built nor encoded.
+
+        Returns:
+            A dictionary where keys are collection names and values are generators of lists of documents.
+        """
         logger.info(f"Structuring documents with '{mode}' model...")
+        if mode not in ('embedding', 'reference', 'bucket'):
+            raise ValueError("Mode must be 'embedding', 'reference' or 'bucket'")
 
         # Ensure the column mapping has been created by a previous step.
         if not self.column_mapping:
             raise ValueError("Column mapping has not been generated. Run normalize_column_names first.")
 
+        batch_size = batch_size or config.LOAD_BATCH_SIZE
+        skip = skip or {}
+
         # --- 1. Dynamic Key Translation ---
         # Get original keys from the config and find their current normalized names using the mapping.
-        patient_keys_norm = [self.column_mapping[k] for k in config.PATIENT_KEYS]
-        hospitalization_keys_norm = [self.column_mapping[k] for k in config.HOSPITALIZATION_KEYS]
+        # Keys are sorted: set iteration order changes with the interpreter hash seed
+        patient_keys_norm = [self.column_mapping[k] for k in sorted(config.PATIENT_KEYS)]
+        hospitalization_keys_norm = [self.column_mapping[k] for k in sorted(config.HOSPITALIZATION_KEYS)]
 
         # --- 2. ID Generation ---
-        df["hospitalization_id"] = df.apply(
-            lambda row: self._generate_hash_id( [row["patient_id"]] + [row[col] for col in hospitalization_keys_norm]), axis=1
-        )
-         # Build patients & hospitalizations dataframes
-        df_patient = df[["patient_id"] + patient_keys_norm].drop_duplicates("patient_id")
-        df_patient["name"] = df["name_dict"]  # inject parsed names
-        df_hosp = df[["hospitalization_id", "patient_id"] + hospitalization_keys_norm]
+        with self.report.stage("hospitalization_ids", df) as stage:
+            df["hospitalization_id"] = generate_hash_ids(
+                df, ["patient_id"] + hospitalization_keys_norm, workers=config.ID_HASH_WORKERS
+            )
+            stage.output(df)
+
+        # --- 3. Group rows by patient ---
+        # Row positions sorted by patient, each patient's rows being order[bounds[i]:bounds[i + 1]]
+        codes, patient_ids = pd.factorize(df["patient_id"], sort=order_by_id)
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(codes[order], np.arange(len(patient_ids) + 1))
+        first_rows = order[bounds[:-1]]
+
+        # We use same name as hospitalization collection for consistency
+        embedded_field = config.COLLECTION_HOSPITALIZATIONS
+
+        def patient_slices(collection_name):
+            # (patients, their hospitalizations, number of hospitalizations of each patient) per batch
+            for number, start in enumerate(range(0, len(first_rows), batch_size), start=1):
+                if number in skip.get(collection_name, ()):
+                    continue
+                stop = min(start + batch_size, len(first_rows))
+                df_patient = df.iloc[first_rows[start:stop]][["patient_id"] + patient_keys_norm]
+                if mode in ('embedding', 'bucket'):
+                    # Embed into patients or buckets, hospitalization_id is not needed for these models
+                    hospitalizations = df.iloc[order[bounds[start]:bounds[stop]]][hospitalization_keys_norm]
+                    yield df_patient, hospitalizations, np.diff(bounds[start:stop + 1]).tolist()
+                else:
+                    yield df_patient, None, None
+
+        def hospitalization_slices():
+            columns = ["hospitalization_id", "patient_id"] + hospitalization_keys_norm
+            rows = np.argsort(df["hospitalization_id"].to_numpy(), kind="stable") if order_by_id else np.arange(len(df))
+            for number, start in enumerate(range(0, len(df), batch_size), start=1):
+                if number in skip.get(config.COLLECTION_HOSPITALIZATIONS, ()):
+                    continue
+                yield (df.iloc[rows[start:start + batch_size]][columns],)
 
-        # Build patients & hospitalizations collections
-        df_patient = df_patient.rename(columns={"patient_id" : "_id"})
-        patients = df_patient.to_dict(orient="records")   
+        def patient_batches():
+            for df_patient, hospitalizations, counts in patient_slices(config.COLLECTION_PATIENTS):
+                with self.report.stage("build_documents", len(df_patient)) as stage:
+                    patients = patient_documents(df_patient, self.name_table, hospitalizations, counts, embedded_field)
+                    stage.output(patients)
+                yield patients
+
+        def hospitalization_batches():
+            for (df_hosp,) in hospitalization_slices():
+                with self.report.stage("build_documents", len(df_hosp)) as stage:
+                    hospitalizations = hospitalization_documents(df_hosp)
+                    stage.output(hospitalizations)
+                yield hospitalizations
+
+        def encoded_batches(function, slices):
+            # Time spent waiting for the worker processes to build and encode each batch
+            batches = BsonEncoder(encode_workers, self.name_table).encode(function, slices)
+            while True:
+                with self.report.stage("build_encode_documents") as stage:
+                    batch = next(batches, None)
+                    stage.output(batch if batch is not None else 0)
+                if batch is None:
+                    break
+                yield batch
+
+        if mode == 'bucket':
+            return self._bucket_batches(patient_slices, encode_workers, encoded_batches)
+
+        # Generators are lazy: nothing is built for a collection that is not loaded
+        if encode_workers > 0:
+            logger.info(f"Documents are built and encoded to BSON by {encode_workers} processes.")
+            batches = {
+                config.COLLECTION_PATIENTS: encoded_batches(
+                    encode_patients, ((*batch_slices, embedded_field)
+                                      for batch_slices in patient_slices(config.COLLECTION_PATIENTS))),
+                config.COLLECTION_HOSPITALIZATIONS: encoded_batches(encode_hospitalizations, hospitalization_slices()),
+            }
+        else:
+            batches = {
+                config.COLLECTION_PATIENTS: patient_batches(),
+                config.COLLECTION_HOSPITALIZATIONS: hospitalization_batches(),
+            }
 
         if mode == 'reference':
-            df_hosp = df_hosp.rename(columns={"hospitalization_id": "_id"})
-            hospitalizations = df_hosp.to_dict(orient="records")
+            return batches
+        return { config.COLLECTION_PATIENTS: batches[config.COLLECTION_PATIENTS] }
+
+    def _bucket_batches(self, patient_slices, encode_workers, encoded_batches):
+        """
+        'bucket' mode batches of iter_documents: small patient documents with a summary of their
+        recent stays, and the stays themselves in bucket documents of at most config.BUCKET_SIZE stays.
+        """
+        embedded_field = config.COLLECTION_HOSPITALIZATIONS
+        date_field = self.column_mapping["Date of Admission"]
+        patient_args = (date_field, config.BUCKET_RECENT_STAYS, config.BUCKET_SUMMARY_FIELDS)
+        bucket_args = (date_field, config.BUCKET_SIZE, embedded_field)
+
+        if encode_workers > 0:
+            logger.info(f"Documents are built and encoded to BSON by {encode_workers} processes.")
             return {
-                config.COLLECTION_PATIENTS: patients, 
-                config.COLLECTION_HOSPITALIZATIONS: hospitalizations
-            }    
-        
-        elif mode == 'embedding':
-            # We don't need hospitalization_id for this model
-            df_hosp = df_hosp.drop(columns=['hospitalization_id'])
-            hospitalizations = df_hosp.to_dict(orient="records")
-
-            # Group hospitalizations by patient
-            hospitalizations_grouped = defaultdict(list)
-
-            for hosp in hospitalizations:
-                patient_id = hosp.pop("patient_id")
-                hospitalizations_grouped[patient_id].append(hosp)
-
-            # Embed into patients
-            # We use same name as hospitalization collection for consistency
-            embedded_field = config.COLLECTION_HOSPITALIZATIONS
-            for patient in patients:
-                patient[embedded_field] = hospitalizations_grouped.get(patient["_id"], [])
-            
-            return { config.COLLECTION_PATIENTS: patients }
-        else:
-            raise ValueError("Mode must be 'embedding' or 'reference'")
+                config.COLLECTION_PATIENTS: encoded_batches(
+                    encode_bucket_patients, ((*batch_slices, *patient_args)
+                                             for batch_slices in patient_slices(config.COLLECTION_PATIENTS))),
+                config.COLLECTION_HOSPITALIZATION_BUCKETS: encoded_batches(
+                    encode_buckets, ((df_patient["patient_id"].tolist(), hospitalizations, counts, *bucket_args)
+                                     for df_patient, hospitalizations, counts
+                                     in patient_slices(config.COLLECTION_HOSPITALIZATION_BUCKETS))),
+            }
+
+        def patient_batches():
+            for df_patient, hospitalizations, counts in patient_slices(config.COLLECTION_PATIENTS):
+                with self.report.stage("build_documents", len(df_patient)) as stage:
+                    patients = bucket_patient_documents(df_patient, self.name_table, hospitalizations, counts, *patient_args)
+                    stage.output(patients)
+                yield patients
+
+        def bucket_batches():
+            for df_patient, hospitalizations, counts in patient_slices(config.COLLECTION_HOSPITALIZATION_BUCKETS):
+                with self.report.stage("build_documents", len(hospitalizations)) as stage:
+                    buckets = bucket_documents(df_patient["patient_id"].tolist(), hospitalizations, counts, *bucket_args)
+                    stage.output(buckets)
+                yield buckets
+
+        return {
+            config.COLLECTION_PATIENTS: patient_batches(),
+            config.COLLECTION_HOSPITALIZATION_BUCKETS: bucket_batches(),
+        }
+
+    @staticmethod
+    def _read_csv_options(engine):
+        """pd.read_csv arguments derived from config.SOURCE_SCHEMA: explicit dtypes, nothing inferred."""
+        date_columns = [col for col, dtype in config.SOURCE_SCHEMA.items() if dtype.startswith("datetime")]
+        return {
+            "usecols": list(config.SOURCE_SCHEMA),
+            "dtype": {col: dtype for col, dtype in config.SOURCE_SCHEMA.items() if col not in date_columns},
+            "parse_dates": date_columns,
+            "date_format": config.SOURCE_DATE_FORMAT,
+            "na_values": config.SOURCE_NA_VALUES,
+            "keep_default_na": False,
+            "engine": engine,
+        }
 
     def extract(self, csv_path):
         """Extract: Read source(csv) file """
         logger.info(f"Extracting data from : {csv_path}")
-        df = pd.read_csv(csv_path)
+        with self.report.stage("extract") as stage:
+            df = pd.read_csv(csv_path, **self._read_csv_options(config.CSV_ENGINE))
+            if config.CSV_ENGINE == "pyarrow":
+                # Missing texts are None with the pyarrow reader and NaN with the c one: they are part of the ids ('nan')
+                for col in df.select_dtypes(include="object").columns:
+                    df[col] = df[col].where(df[col].notna(), np.nan)
+            stage.output(df, deep_memory=True)
         mem_bytes = df.memory_usage(deep=True).sum()
         logger.info(f"Data extracted: {len(df)} lines, {len(df.columns)} coloumns.Memory usage: {mem_bytes / 1_048_576: .2f} MB")
         return df
     
-    def transform(self, df):
-        """
-        Cleans, normalizes, and structures the data according to the modeling strategy in the config.
+    def extract_chunks(self, csv_path, chunk_size):
+        """Extract: Read source(csv) file lazily, chunk_size rows at a time"""
+        logger.info(f"Extracting data from : {csv_path} by chunks of {chunk_size} rows")
+        reader = pd.read_csv(csv_path, chunksize=chunk_size, **self._read_csv_options("c"))
+        while True:
+            with self.report.stage("extract") as stage:
+                chunk = next(reader, None)
+                stage.output(chunk if chunk is not None else 0)
+            if chunk is None:
+                break
+            mem_bytes = chunk.memory_usage(deep=True).sum()
+            logger.info(f"Chunk extracted: {len(chunk)} lines. Memory usage: {mem_bytes / 1_048_576: .2f} MB")
+            yield chunk
+
+    def clean(self, df, state=None):
         """
-        logger.info(f"Transformation started.Initial shape of the dataframe: {df.shape}")   
+        Cleans and normalizes the data: deduplication, name parsing, billing and date normalization,
+        patient id generation and column renaming.
 
+        Args:
+            df (pd.DataFrame): The raw DataFrame (or chunk of it) as read from the source file.
+            state (StreamState, optional): Cross-chunk state when the file is processed by chunks.
+
+        Returns:
+            The cleaned DataFrame with normalized column names.
+        """
         # --- 1. CLEANING & FEATURE ENGINEERING 
+        report = self.report
+        deep = config.REPORT_DEEP_MEMORY
+
         # Explicit intention of dataframe update, to avoid copy warning
-        df = df.copy()
+        with report.stage("copy", df) as stage:
+            df = df.copy()
+            stage.output(df, deep)
+        self._last_rows = None
         self.track_changes(df, "Initial state")
 
         # Drop full duplicated rows
-        df = df.drop_duplicates()   
+        with report.stage("dedup_full_rows", df) as stage:
+            if state is not None and state.keep is not None:
+                # Both deduplication passes already ran on disk over the whole file
+                df = df[state.keep[df.index.to_numpy()]]
+            else:
+                df = self._drop_duplicates(df, seen=state.seen_rows if state else None)
+            stage.output(df, deep)
         self.track_changes(df, "Remove full duplicates")
 
-        # Normalize and tokenize name column
-        df["Name"] = df["Name"].str.title()
-        df["name_dict"] = df["Name"].apply(self._parse_name)
+        # Normalize and tokenize name column: each distinct name is parsed once,
+        # rows keep a category code until documents are built
+        with report.stage("name_parsing", df) as stage:
+            df["Name"] = df["Name"].str.title().astype("category")
+            self.name_table = parse_name_table(df["Name"].cat.categories)
+            stage.output(df, deep)
         self.track_changes(df, "Parsing 'Name' column")
 
         # Deduplication by checking the age field (anomaly noticed meanwhile my analyse on jupyter notebook)
         # There are around 5 thousand records where every field is identical except "Age"
-        df = df.drop_duplicates( subset = ( config.HOSPITALIZATION_KEYS - {"Age"}))
+        with report.stage("dedup_except_age", df) as stage:
+            if state is None or state.keep is None:
+                df = self._drop_duplicates(df, subset=(config.HOSPITALIZATION_KEYS - {"Age"}),
+                                           seen=state.seen_hospitalizations if state else None)
+            stage.output(df, deep)
         self.track_changes(df, "Deduplication by excluding Age")
 
         # Normalize billing amounts abs() + round()        
-        df["is_billing_amount_imputed"] = df["Billing Amount"] < 0
-        df["Billing Amount"] = df["Billing Amount"].abs().round(2)
+        with report.stage("billing_normalization", df) as stage:
+            df["is_billing_amount_imputed"] = df["Billing Amount"] < 0
+            df["Billing Amount"] = df["Billing Amount"].abs().round(2)
+            stage.output(df, deep)
         self.track_changes(df, "Normalizing 'Billing Ammount' field")
 
         # Normalize date fields
-        df["Date of Admission"] = pd.to_datetime(df["Date of Admission"])
-        df["Discharge Date"] = pd.to_datetime(df["Discharge Date"])
+        with report.stage("date_parsing", df) as stage:
+            df["Date of Admission"] = pd.to_datetime(df["Date of Admission"])
+            df["Discharge Date"] = pd.to_datetime(df["Discharge Date"])
+            stage.output(df, deep)
         self.track_changes(df, "Normalizing date values")
 
-        # Generate unique id for patient
-        df["Patient Id"] = df.apply(lambda row: self._generate_hash_id( [row[col] for col in config.PATIENT_KEYS] ), axis=1)        
+        # Generate unique id for patient (keys sorted so that ids do not depend on the set order)
+        with report.stage("patient_ids", df) as stage:
+            df["Patient Id"] = generate_hash_ids(df, sorted(config.PATIENT_KEYS), workers=config.ID_HASH_WORKERS)
+            stage.output(df, deep)
         self.track_changes(df, "Generating patient ids")
 
         # --- 2. NORMALIZE COLUMN NAMES ---
-        # Normalize column names
-        df = self.normalize_column_names(df)
+        with report.stage("normalize_column_names", df) as stage:
+            if state is not None and self.column_mapping:
+                # Mapping already checked and logged with the first chunk
+                df = df.rename(columns=self.column_mapping)
+            else:
+                df = self.normalize_column_names(df)
+            stage.output(df, deep)
         self.track_changes(df, "Normalizing column names")
+        return df
+
+    def extract_clean(self, csv_path):
+        """
+        Extract + clean of a whole file, with the transform engine of config.TRANSFORM_ENGINE.
+
+        Returns:
+            The cleaned DataFrame with normalized column names.
+        """
+        if config.TRANSFORM_ENGINE != 'polars':
+            return self.clean(self.extract(csv_path))
+
+        # Imported here: polars is only needed by this engine
+        from scripts.polars_engine import clean_file
+
+        df, self.name_table = clean_file(csv_path, self.report, workers=config.ID_HASH_WORKERS)
+        with self.report.stage("normalize_column_names", df) as stage:
+            df = self.normalize_column_names(df)
+            stage.output(df)
+        return df
+
+    def prepare_chunk(self, chunk, fingerprints=True):
+        """
+        The row-wise steps of clean(), which do not depend on the other chunks and can run concurrently
+        (pipelined mode). Rows are not deduplicated yet: the fingerprints of both deduplication passes
+        are returned along with the chunk, for dedup_chunk() to apply them in chunk order.
+
+        Returns:
+            (DataFrame, full row fingerprints, fingerprints without Age), fingerprints being None
+            when not requested ('disk' dedup backend).
+        """
+        report = self.report
+        row_fingerprints = hospitalization_fingerprints = None
+        if fingerprints:
+            with report.stage("row_fingerprints", chunk) as stage:
+                row_fingerprints = self._row_fingerprints(chunk)
+                stage.output(len(row_fingerprints))
+
+        with report.stage("name_parsing", chunk) as stage:
+            chunk["Name"] = chunk["Name"].str.title().astype("category")
+            stage.output(chunk)
+
+        if fingerprints:
+            with report.stage("hospitalization_fingerprints", chunk) as stage:
+                hospitalization_fingerprints = self._row_fingerprints(chunk, config.HOSPITALIZATION_KEYS - {"Age"})
+                stage.output(len(hospitalization_fingerprints))
+
+        with report.stage("billing_normalization", chunk) as stage:
+            chunk["is_billing_amount_imputed"] = chunk["Billing Amount"] < 0
+            chunk["Billing Amount"] = chunk["Billing Amount"].abs().round(2)
+            stage.output(chunk)
+
+        with report.stage("date_parsing", chunk) as stage:
+            chunk["Date of Admission"] = pd.to_datetime(chunk["Date of Admission"])
+            chunk["Discharge Date"] = pd.to_datetime(chunk["Discharge Date"])
+            stage.output(chunk)
+
+        with report.stage("patient_ids", chunk) as stage:
+            chunk["Patient Id"] = generate_hash_ids(chunk, sorted(config.PATIENT_KEYS), workers=config.ID_HASH_WORKERS)
+            stage.output(chunk)
+        return chunk, row_fingerprints, hospitalization_fingerprints
+
+    def dedup_chunk(self, df, row_fingerprints, hospitalization_fingerprints, state):
+        """
+        The order-dependent steps of clean() for a chunk from prepare_chunk(): both deduplication passes
+        against the rows kept by the previous chunks, and the column renaming. Must be called in chunk order.
+        """
+        with self.report.stage("dedup", df) as stage:
+            if state.keep is not None:
+                df = df[state.keep[df.index.to_numpy()]]
+            else:
+                keep = self._first_seen(row_fingerprints, state.seen_rows)
+                df, hospitalization_fingerprints = df[keep], hospitalization_fingerprints[keep]
+                df = df[self._first_seen(hospitalization_fingerprints, state.seen_hospitalizations)]
+            stage.output(df)
+
+        with self.report.stage("normalize_column_names", df) as stage:
+            if self.column_mapping:
+                df = df.rename(columns=self.column_mapping)
+            else:
+                df = self.normalize_column_names(df)
+            stage.output(df)
+        return df
+
+    def cached_clean(self, csv_path):
+        """
+        Extract + clean, reusing the checkpoint of a previous run when the source file,
+        the transform logic and its configuration did not change.
+        """
+        cache = TransformCache(config.CHECKPOINT_DIR, config.CHECKPOINT_MAX_MB * 1_048_576)
+        key = self.transform_key = cache.key(csv_path)
+
+        cached = cache.load(key)
+        if cached is not None:
+            df, self.column_mapping = cached
+            return df
+
+        df = self.extract_clean(csv_path)
+        cache.save(key, df, self.column_mapping)
+        return df
+
+    def transform(self, df):
+        """
+        Cleans, normalizes, and structures the data according to the modeling strategy in the config.
+        """
+        logger.info(f"Transformation started.Initial shape of the dataframe: {df.shape}")   
+
+        # --- 1. CLEANING & 2. NORMALIZE COLUMN NAMES ---
+        df = self.clean(df)
 
         # --- 3. BUILD FINAL DOCUMENTS ---
         documents_by_collection = self.build_documents(df, mode=config.DATA_MODELLING_MODE)
@@ -305,14 +726,18 @@ class ETLPipeline:
         logger.info(f"Actual shape of the dataframe: {df.shape}")   
         return documents_by_collection
     
-    def load(self, collections_data ):
+    def load(self, collections_data, committed=None):
         logger.info("Loading started")
         """
         Loads multiple collections of documents into MongoDB.
 
         Args:
-            collections_data: A dictionary where keys are collection names
-                              and values are lists of document records.
+            collections_data: A dictionary where keys are collection names and values are
+                              lists of document records, or generators of batches of records
+                              (see iter_documents) consumed as they are loaded.
+            committed (dict, optional): Resumed load (see _resumed_batches), sizes of the batches of
+                              each collection already written. The generators of batches leave them out
+                              (iter_documents with skip=committed); they are left out of lists here.
 
         Returns:
             The total number of documents inserted across all collections.
@@ -324,49 +749,582 @@ class ETLPipeline:
             logger.warning("No data provided to the load method. Nothing to insert.")
             return 0
         
-        # Clean database before insertion
-        self.clear_collections(config.TARGET_COLLECTIONS)        
+        if committed is None:
+            # Clean database before insertion
+            self.clear_collections([self._collection_name(name) for name in config.TARGET_COLLECTIONS])
+            if self.load_checkpoint is not None:
+                for collection_name in collections_data:
+                    self.load_checkpoint.start(self._collection_name(collection_name))
         
-        # Iterate through each collection name and its list of records
+        # Iterate through each collection name and its list of records (or generator of batches)
         for collection_name, records in collections_data.items():
-                
-            # Check if there are records for the current collection
-            if not records:
-                logger.info(f"Skipping collection '{collection_name}' as it contains no records.")
-                continue
-                
-            logger.info(f"Loading {len(records)} records into collection '{collection_name}'...")
-                
-            # Get the collection object from the database
-            collection = self.db[collection_name]
-                
-            # Perform the bulk insert operation
-            result = collection.insert_many(records)
-                
+
+            if isinstance(records, list):
+                # Check if there are records for the current collection
+                if not records:
+                    logger.info(f"Skipping collection '{collection_name}' as it contains no records.")
+                    continue
+                logger.info(f"Loading {len(records)} records into collection '{collection_name}'...")
+                batches = batched(records, config.LOAD_BATCH_SIZE)
+                if committed is not None:
+                    batches = (batch for number, batch in enumerate(batches, start=1) if number not in committed[collection_name])
+            else:
+                logger.info(f"Loading documents into collection '{collection_name}' as their batches are built...")
+                batches = records
+
+            # Perform the bulk insert operation, by parallel unordered batches
+            target_name = self._collection_name(collection_name)
+            with self.report.stage(f"insert_{collection_name}") as stage:
+                if self.load_checkpoint is None:
+                    result = self.loader.insert_batches(target_name, batches)
+                else:
+                    result = self.loader.insert_batches(
+                        target_name, batches,
+                        committed=committed[collection_name] if committed is not None else None,
+                        on_commit=lambda batch_number, size, name=target_name: self.load_checkpoint.commit(name, batch_number, size),
+                    )
+                stage.output(result.inserted)
+            self.loaded_counts[collection_name] = result.inserted
+
             # Log the success for this specific collection
-            inserted_for_this_collection = len(result.inserted_ids)
+            inserted_for_this_collection = result.inserted
             total_inserted_count += inserted_for_this_collection
             logger.info(f"  ✅ Successfully inserted {inserted_for_this_collection} documents into '{collection_name}'.")
+            self._report_write_errors(collection_name, result)
 
         logger.info(f"Loading process finished. Total documents inserted: {total_inserted_count}")
         return total_inserted_count
       
 
+    def _load_key(self, csv_path):
+        """Identity of a resumable load: the cleaned data (key of its transform checkpoint), the model and the batching."""
+        transform_key = self.transform_key or TransformCache(config.CHECKPOINT_DIR, config.CHECKPOINT_MAX_MB * 1_048_576).key(csv_path)
+        return f"{transform_key}-{config.DATA_MODELLING_MODE}-{config.LOAD_BATCH_SIZE}"
+
+    def _resumed_batches(self, mode):
+        """
+        Resumable load: batches already written by an interrupted run of the same load, read before
+        the documents are built so that those of the written batches are not (see iter_documents).
+
+        Returns:
+            The sizes of the committed batches of each collection of the mode, by batch number,
+            or None when the load starts over.
+        """
+        collection_names = {
+            'embedding': [config.COLLECTION_PATIENTS],
+            'reference': [config.COLLECTION_PATIENTS, config.COLLECTION_HOSPITALIZATIONS],
+            'bucket': [config.COLLECTION_PATIENTS, config.COLLECTION_HOSPITALIZATION_BUCKETS],
+        }[mode]
+        committed = {}
+        for collection_name in collection_names:
+            target_name = self._collection_name(collection_name)
+            batches = self.load_checkpoint.committed(target_name, self.db[target_name].estimated_document_count())
+            if batches is None:
+                return None
+            committed[collection_name] = batches
+        logger.info(f"Resuming an interrupted load, batches already written: "
+                    f"{ {name: len(batches) for name, batches in committed.items()} }")
+        return committed
+
+    @staticmethod
+    def _fingerprint(document):
+        """Content hash of a document, computed on its BSON encoding."""
+        return hashlib.sha1(bson.encode(document)).hexdigest()
+
+    def _report_write_errors(self, collection_name, result):
+        """Failed batches do not stop the load, their write errors are summarized here."""
+        self.write_error_count += len(result.errors)
+        if result.errors:
+            logger.error(f"  ❌ {len(result.errors)} documents could not be written into '{collection_name}'.")
+
+    def load_incremental(self, collections_data):
+        """
+        Loads documents on top of the existing collections, writing only what changed.
+        Each document gets a content fingerprint which is compared with the one already stored
+        under the same deterministic _id: new documents are inserted, changed ones replaced and
+        documents missing from the source deleted.
+
+        Args:
+            collections_data: A dictionary where keys are collection names
+                              and values are lists of document records (or generators of batches).
+
+        Returns:
+            The number of documents inserted or updated across all collections.
+        """
+        logger.info("Incremental loading process started...")
+        fingerprint_field = config.FINGERPRINT_FIELD
+        summary = {"unchanged": 0, "inserted": 0, "updated": 0, "deleted": 0}
+
+        # Collections of the other modelling mode are emptied too, as a full load would drop them
+        for collection_name in config.TARGET_COLLECTIONS:
+            records = collections_data.get(collection_name, [])
+            if not isinstance(records, list):
+                # Generator of batches, see iter_documents
+                records = (record for batch in records for record in batch)
+            collection = self.db[collection_name]
+
+            # One bulk read of the fingerprints already stored
+            stored = {doc["_id"]: doc.get(fingerprint_field) for doc in collection.find({}, {fingerprint_field: 1})}
+            logger.info(f"Comparing records with the {len(stored)} documents of '{collection_name}'...")
+
+            operations = []
+            unchanged = 0
+            for record in records:
+                record[fingerprint_field] = self._fingerprint(record)
+                if record["_id"] not in stored:
+                    operations.append(InsertOne(record))
+                elif stored.pop(record["_id"]) != record[fingerprint_field]:
+                    operations.append(ReplaceOne({"_id": record["_id"]}, record))
+                else:
+                    unchanged += 1
+            # What is left is no longer in the source
+            operations.extend(DeleteOne({"_id": _id}) for _id in stored)
+
+            with self.report.stage(f"bulk_write_{collection_name}", operations) as stage:
+                result = self.loader.bulk_write(collection_name, operations)
+                stage.output(result.inserted + result.updated + result.deleted)
+            self._report_write_errors(collection_name, result)
+            counts = {"unchanged": unchanged, "inserted": result.inserted, "updated": result.updated, "deleted": result.deleted}
+            for key, value in counts.items():
+                summary[key] += value
+            logger.info(f"  ✅ '{collection_name}': {counts['unchanged']} unchanged, {counts['inserted']} inserted, "
+                        f"{counts['updated']} updated, {counts['deleted']} deleted.")
+
+        logger.info(f"Incremental loading finished. {summary['unchanged']} unchanged, {summary['inserted']} inserted, "
+                    f"{summary['updated']} updated, {summary['deleted']} deleted.")
+        return summary["inserted"] + summary["updated"]
+
+    def load_chunk(self, documents_by_collection, state, mode):
+        """
+        Loads the documents built from one chunk, on top of what previous chunks already loaded.
+        Patients met in an earlier chunk are not inserted again; in 'embedding' mode their new
+        hospitalizations are appended to the existing document instead.
+
+        Returns:
+            The number of documents inserted for this chunk.
+        """
+        inserted_count = 0
+        patients = documents_by_collection.get(config.COLLECTION_PATIENTS, [])
+        embedded_field = config.COLLECTION_HOSPITALIZATIONS
+
+        operations = []
+        for patient in patients:
+            if patient["_id"] not in state.seen_patients:
+                state.seen_patients.add(patient["_id"])
+                operations.append(InsertOne(patient))
+            elif mode == 'embedding' and patient[embedded_field]:
+                operations.append(UpdateOne(
+                    {"_id": patient["_id"]},
+                    {"$push": {embedded_field: {"$each": patient[embedded_field]}}}
+                ))
+        if operations:
+            with self.report.stage(f"bulk_write_{config.COLLECTION_PATIENTS}", operations) as stage:
+                result = self.loader.bulk_write(self._collection_name(config.COLLECTION_PATIENTS), operations)
+                stage.output(result.inserted + result.updated)
+            self._report_write_errors(config.COLLECTION_PATIENTS, result)
+            self._count_loaded(config.COLLECTION_PATIENTS, result.inserted)
+            inserted_count += result.inserted
+
+        hospitalizations = documents_by_collection.get(config.COLLECTION_HOSPITALIZATIONS, [])
+        if hospitalizations:
+            with self.report.stage(f"insert_{config.COLLECTION_HOSPITALIZATIONS}", hospitalizations) as stage:
+                result = self.loader.insert(self._collection_name(config.COLLECTION_HOSPITALIZATIONS), hospitalizations)
+                stage.output(result.inserted)
+            self._report_write_errors(config.COLLECTION_HOSPITALIZATIONS, result)
+            self._count_loaded(config.COLLECTION_HOSPITALIZATIONS, result.inserted)
+            inserted_count += result.inserted
+
+        return inserted_count
+
+    def _count_loaded(self, collection_name, inserted):
+        self.loaded_counts[collection_name] = self.loaded_counts.get(collection_name, 0) + inserted
+
+    def merge(self, collections_data, mode):
+        """
+        Merges documents into the existing collections by their deterministic _id (directory ingestion):
+        new patients are inserted and, in 'embedding' mode, the hospitalizations of known patients
+        are added to their document unless already there ($addToSet). Hospitalization documents
+        ('reference' mode) are upserted. Merging the same file twice changes nothing.
+
+        Args:
+            collections_data: A dictionary where keys are collection names
+                              and values are lists of document records (or generators of batches).
+
+        Returns:
+            The number of documents inserted or updated across all collections.
+        """
+        embedded_field = config.COLLECTION_HOSPITALIZATIONS
+        total_written = 0
+        for collection_name, records in collections_data.items():
+            if not isinstance(records, list):
+                # Generator of batches, see iter_documents
+                records = (record for batch in records for record in batch)
+
+            operations = []
+            for record in records:
+                _id = record.pop("_id")
+                if collection_name != config.COLLECTION_PATIENTS:
+                    operations.append(ReplaceOne({"_id": _id}, record, upsert=True))
+                    continue
+                update = {}
+                if mode == 'embedding':
+                    update["$addToSet"] = {embedded_field: {"$each": record.pop(embedded_field)}}
+                update["$setOnInsert"] = record
+                operations.append(UpdateOne({"_id": _id}, update, upsert=True))
+
+            with self.report.stage(f"merge_{collection_name}", operations) as stage:
+                result = self.loader.bulk_write(self._collection_name(collection_name), operations)
+                stage.output(result.inserted + result.updated)
+            self._report_write_errors(collection_name, result)
+            total_written += result.inserted + result.updated
+            logger.info(f"  ✅ '{collection_name}': {result.inserted} documents inserted, {result.updated} updated.")
+        return total_written
+
+    def find_duplicates(self, csv_path, chunk_size):
+        """
+        'disk' dedup backend: a first pass over the source file spills the 128-bit fingerprints
+        of the full rows and of the rows without Age to disk, then deduplicates them partition by
+        partition. Only the resulting keep mask (one byte per source row) stays in memory.
+
+        Returns:
+            A boolean array indexed by row number, with the same rows kept as the in-memory path.
+        """
+        logger.info(f"Finding duplicates on disk ({config.DEDUP_PARTITIONS} partitions in '{config.DEDUP_SPILL_DIR}')...")
+        key_columns = config.HOSPITALIZATION_KEYS - {"Age"}
+        with ExternalDeduplicator(config.DEDUP_SPILL_DIR, config.DEDUP_PARTITIONS, levels=2) as dedup:
+            for chunk in self.extract_chunks(csv_path, chunk_size):
+                with self.report.stage("dedup_spill", chunk):
+                    rows = chunk.index.to_numpy()
+                    dedup.add(0, rows, self._row_fingerprints128(chunk))
+                    # Names are compared once title-cased, as in clean()
+                    chunk["Name"] = chunk["Name"].str.title().astype("category")
+                    dedup.add(1, rows, self._row_fingerprints128(chunk, key_columns))
+            with self.report.stage("dedup_partitions") as stage:
+                keep = dedup.keep_mask()
+                stage.output(int(keep.sum()))
+        logger.info(f"✅ {int(keep.sum())} rows kept out of {len(keep)}.")
+        return keep
+
+    def run_streaming(self, csv_path, chunk_size):
+        """
+        Extract, transform and load the source file chunk by chunk, so that peak memory
+        depends on chunk_size rather than on the file size.
+
+        Returns:
+            The total number of documents inserted across all collections.
+        """
+        mode = config.DATA_MODELLING_MODE
+        logger.info(f"Streaming mode: processing '{csv_path}' by chunks of {chunk_size} rows ('{mode}' model)")
+
+        state = StreamState()
+        if config.DEDUP_BACKEND == 'disk':
+            state.keep = self.find_duplicates(csv_path, chunk_size)
+        self.column_mapping = {}
+        total_inserted_count = 0
+
+        # Clean database before insertion
+        self.clear_collections([self._collection_name(name) for name in config.TARGET_COLLECTIONS])
+
+        for chunk_number, chunk in enumerate(self.extract_chunks(csv_path, chunk_size), start=1):
+            df = self.clean(chunk, state)
+            self.summarize(df)
+            documents_by_collection = self.build_documents(df, mode)
+            inserted_count = self.load_chunk(documents_by_collection, state, mode)
+            total_inserted_count += inserted_count
+            logger.info(f"  ✅ Chunk {chunk_number}: {len(chunk)} rows read, {len(df)} kept, {inserted_count} documents inserted.")
+
+        logger.info(f"Streaming finished. {len(state.seen_patients)} patients, total documents inserted: {total_inserted_count}")
+        return total_inserted_count
+
+    def run_pipelined(self, csv_path, chunk_size):
+        """
+        Streaming with overlapped stages: a reader thread extracts the chunks, a pool of transform
+        threads cleans them and builds their documents, and a loader thread writes them, the stages
+        being connected by bounded queues. Deduplication and loading keep the chunk order, so the
+        result is the same as run_streaming(). The first error of a stage cancels the others.
+
+        Returns:
+            The total number of documents inserted across all collections.
+        """
+        mode = config.DATA_MODELLING_MODE
+        workers = max(1, config.TRANSFORM_WORKERS)
+        logger.info(f"Pipelined mode: processing '{csv_path}' by chunks of {chunk_size} rows ('{mode}' model), "
+                    f"{workers} transform workers")
+
+        state = StreamState()
+        if config.DEDUP_BACKEND == 'disk':
+            state.keep = self.find_duplicates(csv_path, chunk_size)
+        self.column_mapping = {}
+        # Distinct names are parsed per chunk by the workers (see name_documents)
+        self.name_table = None
+        inserted = {"total": 0}
+
+        # Clean database before insertion
+        self.clear_collections([self._collection_name(name) for name in config.TARGET_COLLECTIONS])
+
+        runner = StageRunner(queue_size=config.PIPELINE_QUEUE_SIZE)
+        chunks, documents = runner.queue(), runner.queue()
+        dedup_turn = Turnstile(runner)
+
+        def read():
+            for number, chunk in enumerate(self.extract_chunks(csv_path, chunk_size)):
+                runner.put(chunks, (number, chunk))
+            runner.put(chunks, END)
+
+        def transform():
+            while (item := runner.get(chunks)) is not END:
+                number, chunk = item
+                rows_read = len(chunk)
+                df, row_fingerprints, hospitalization_fingerprints = self.prepare_chunk(
+                    chunk, fingerprints=state.keep is None)
+                dedup_turn.wait_turn(number)
+                try:
+                    df = self.dedup_chunk(df, row_fingerprints, hospitalization_fingerprints, state)
+                finally:
+                    dedup_turn.done()
+                self.summarize(df)
+                runner.put(documents, (number, rows_read, len(df), self.build_documents(df, mode)))
+            # Lets the other workers stop too
+            runner.put(chunks, END)
+            runner.put(documents, END)
+
+        def load():
+            # Chunks are loaded in order: a patient must be inserted before its later stays are pushed
+            pending = {}
+            next_number = 0
+            finished_workers = 0
+            while finished_workers < workers:
+                item = runner.get(documents)
+                if item is END:
+                    finished_workers += 1
+                    continue
+                pending[item[0]] = item[1:]
+                while next_number in pending:
+                    rows_read, rows_kept, documents_by_collection = pending.pop(next_number)
+                    inserted_count = self.load_chunk(documents_by_collection, state, mode)
+                    inserted["total"] += inserted_count
+                    next_number += 1
+                    logger.info(f"  ✅ Chunk {next_number}: {rows_read} rows read, {rows_kept} kept, "
+                                f"{inserted_count} documents inserted.")
+
+        runner.start("reader", read)
+        for worker in range(workers):
+            runner.start(f"transform-{worker}", transform)
+        runner.start("loader", load)
+        runner.join()
+
+        logger.info(f"Pipelined streaming finished. {len(state.seen_patients)} patients, "
+                    f"total documents inserted: {inserted['total']}")
+        return inserted["total"]
+
+    def summarize(self, df):
+        """Adds a cleaned DataFrame (or chunk) to the analytics rollups, when they are enabled."""
+        if self.summaries is None:
+            return
+        with self.report.stage("summaries", df):
+            self.summaries.add(df)
+
+    @staticmethod
+    def _summary_collections():
+        if not config.SUMMARIES_ENABLED:
+            return []
+        return [f"{config.SUMMARY_COLLECTION_PREFIX}{name}" for name in config.SUMMARIES]
+
+    def load_summaries(self):
+        """
+        Replaces the summary collections with the rollups of this run.
+
+        Returns:
+            The number of summary documents inserted.
+        """
+        logger.info("Loading summary collections...")
+        total_inserted_count = 0
+        for name, documents in self.summaries.documents().items():
+            collection_name = f"{config.SUMMARY_COLLECTION_PREFIX}{name}"
+            self.db[self._collection_name(collection_name)].drop()
+            with self.report.stage(f"insert_{collection_name}", documents) as stage:
+                result = self.loader.insert(self._collection_name(collection_name), documents)
+                stage.output(result.inserted)
+            self._report_write_errors(collection_name, result)
+            self.loaded_counts[collection_name] = result.inserted
+            total_inserted_count += result.inserted
+            logger.info(f"  ✅ {result.inserted} documents inserted into '{collection_name}'.")
+        return total_inserted_count
+
+    def use_staging_collections(self):
+        """Redirects the following loads to the staging copies of the target collections."""
+        self.collection_names = {name: f"{name}{config.STAGING_SUFFIX}"
+                                 for name in config.TARGET_COLLECTIONS + self._summary_collections()}
+        logger.info(f"Staging load: documents go to {list(self.collection_names.values())} until the swap.")
+
+    def swap_staging_collections(self):
+        """
+        Checks the loaded staging collections, then renames each one over its live collection
+        (renameCollection with dropTarget), so that readers switch from the old complete data
+        to the new complete and indexed data. The live collections are left untouched if a check fails.
+
+        Raises:
+            ValueError: If documents could not be written or a staging collection count is wrong.
+        """
+        if self.write_error_count:
+            raise ValueError(f"{self.write_error_count} documents could not be written, "
+                             f"live collections left untouched (staging collections kept for inspection)")
+
+        for collection_name, expected_count in self.loaded_counts.items():
+            staging_name = self._collection_name(collection_name)
+            count = self.db[staging_name].count_documents({})
+            if count != expected_count:
+                raise ValueError(f"'{staging_name}' holds {count} documents instead of {expected_count}, "
+                                 f"live collections left untouched")
+            logger.info(f"  ✅ '{staging_name}': {count} documents, as loaded.")
+
+        existing_collections = set(self.db.list_collection_names())
+        for collection_name in config.TARGET_COLLECTIONS + self._summary_collections():
+            staging_name = self._collection_name(collection_name)
+            if staging_name in existing_collections:
+                logger.info(f"   Swapping '{staging_name}' → '{collection_name}' ...")
+                self.db[staging_name].rename(collection_name, dropTarget=True)
+            elif collection_name in existing_collections:
+                # Not produced by this load (other modelling mode or no records), dropped as a full load would
+                logger.info(f"   ➖ Dropping collection: '{collection_name}' ...")
+                self.db[collection_name].drop()
+        self.collection_names = {}
+        logger.info("✅ Staging collections are live.")
+
+    def _write_run_report(self, status, total_inserted_count):
+        """A failing report must not hide the outcome of the run itself."""
+        try:
+            self.report.write(config.REPORT_DIR, status, total_inserted_count, prometheus=config.PROMETHEUS_TEXTFILE)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write the run report: {e}")
+
+    def _write_run_marker(self, status):
+        """
+        Replaces the run marker with the ID of this run, failed runs included (a failed full load
+        also changes the live collections): readers caching query results, like PatientLookup,
+        drop their cache when the run ID changes.
+        """
+        try:
+            self.db[config.RUN_MARKER_COLLECTION].replace_one(
+                {"_id": config.RUN_MARKER_ID},
+                {
+                    "run_id": self.report.context["run_id"],
+                    "status": status,
+                    "finished_at": datetime.now(timezone.utc),
+                    "modelling_mode": config.DATA_MODELLING_MODE,
+                    "load_mode": config.LOAD_MODE,
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not write the run marker: {e}")
+
     def run_etl(self, csv_path):
         logger.info("====================== PIPELINE START ======================")
         total_inserted_count = 0
+        status = "failed"
+        self.report = RunReport(
+            run_id=uuid.uuid4().hex,
+            deep_memory=config.REPORT_DEEP_MEMORY,
+            source=str(csv_path),
+            modelling_mode=config.DATA_MODELLING_MODE,
+            load_mode=config.LOAD_MODE,
+            chunk_size=config.CHUNK_SIZE,
+        )
+        self.collection_names = {}
+        self.loaded_counts = {}
+        self.write_error_count = 0
+        self.summaries = None
+        self.transform_key = None
+        self.load_checkpoint = None
         try:
-             # Step 1: Extract data from the source file
-            source_df = self.extract(csv_path)
+            if config.LOAD_MODE not in ('full', 'incremental', 'staging'):
+                raise ValueError("Load mode must be 'full', 'incremental' or 'staging'")
+            if config.DEDUP_BACKEND not in ('memory', 'disk'):
+                raise ValueError("Dedup backend must be 'memory' or 'disk'")
+            if config.TRANSFORM_ENGINE not in ('pandas', 'polars'):
+                raise ValueError("Transform engine must be 'pandas' or 'polars'")
+            if config.TRANSFORM_ENGINE == 'polars' and config.CHUNK_SIZE:
+                raise ValueError("The 'polars' transform engine processes whole files (ETL_CHUNK_SIZE = 0)")
+            if config.DEDUP_BACKEND == 'disk' and not config.CHUNK_SIZE:
+                raise ValueError("The 'disk' dedup backend is for files processed by chunks (ETL_CHUNK_SIZE > 0)")
+            if config.RESUMABLE_LOAD and (config.CHUNK_SIZE or config.LOAD_MODE == 'incremental'):
+                raise ValueError("Resumable loads are for whole-file 'full' or 'staging' loads (ETL_CHUNK_SIZE = 0)")
+            if config.RESUMABLE_LOAD and config.LOAD_PARTITIONS:
+                raise ValueError("Resumable loads are not available with partitioned loads (ETL_LOAD_PARTITIONS = 0)")
+            if config.LOAD_MODE == 'staging':
+                # Steps 3 & 4 write to staging collections, the live ones are only replaced at the end
+                self.use_staging_collections()
+            if config.SUMMARIES_ENABLED:
+                # Rollups are accumulated while the data is cleaned (chunk by chunk in streaming mode)
+                self.summaries = SummaryBuilder(config.SUMMARIES)
+
+            if config.CHUNK_SIZE:
+                if config.LOAD_MODE == 'incremental':
+                    raise ValueError("Incremental load is not available in streaming mode (ETL_CHUNK_SIZE > 0)")
+                if config.DATA_MODELLING_MODE == 'bucket':
+                    # Buckets are cut from all the stays of a patient, which may be spread over several chunks
+                    raise ValueError("The 'bucket' model is not available in streaming mode (ETL_CHUNK_SIZE > 0)")
+                # Steps 1 to 3 chunk by chunk, with bounded memory
+                if config.PIPELINED:
+                    total_inserted_count = self.run_pipelined(csv_path, config.CHUNK_SIZE)
+                else:
+                    total_inserted_count = self.run_streaming(csv_path, config.CHUNK_SIZE)
+            elif config.PIPELINED:
+                raise ValueError("Pipelined mode needs chunks to overlap (ETL_CHUNK_SIZE > 0)")
+            else:
+                if config.CHECKPOINT_ENABLED:
+                    # Steps 1 & 2: cleaned data, straight from the checkpoint when the source did not change
+                    df = self.cached_clean(csv_path)
+                elif config.TRANSFORM_ENGINE == 'polars':
+                    # Steps 1 & 2 in one lazy, multi-threaded polars query
+                    df = self.extract_clean(csv_path)
+                else:
+                    # Step 1: Extract data from the source file
+                    source_df = self.extract(csv_path)
+
+                    # Step 2: Transform the data : cleaning and normalization
+                    df = self.clean(source_df)
+                    del source_df
+                self.summarize(df)
 
-            # Step 2: Transform the data : cleaning, normalization and structuring
-            collections_to_load = self.transform(source_df)
+                # Step 2 (end): structuring. Documents are built lazily, batch by batch,
+                # so that loading starts with the first batch. They can be built and encoded to BSON
+                # by worker processes, except for the incremental load which fingerprints each document
+                encode_workers = config.BSON_ENCODE_WORKERS if config.LOAD_MODE != 'incremental' else 0
+                committed = None
+                if config.RESUMABLE_LOAD:
+                    # Batches written are recorded, an interrupted load of the same data resumes from them
+                    self.load_checkpoint = LoadCheckpoint(self.db[config.LOAD_CHECKPOINT_COLLECTION], self._load_key(csv_path))
+                    committed = self._resumed_batches(config.DATA_MODELLING_MODE)
+                collections_to_load = self.iter_documents(df, mode=config.DATA_MODELLING_MODE,
+                                                          encode_workers=encode_workers,
+                                                          order_by_id=config.RESUMABLE_LOAD, skip=committed)
 
-            # Step 3: Load the resulting documents into their respective collections
-            total_inserted_count = self.load(collections_to_load)
+                # Step 3: Load the resulting documents into their respective collections
+                if config.LOAD_MODE == 'incremental':
+                    total_inserted_count = self.load_incremental(collections_to_load)
+                else:
+                    total_inserted_count = self.load(collections_to_load, committed)
+
+            # Step 3 (end): analytics summary collections
+            if self.summaries is not None:
+                total_inserted_count += self.load_summaries()
+            if isinstance(self.loader, PartitionedLoader):
+                self.loader.log_report()
+                self.report.context["load_partitions"] = self.loader.report()
 
             # Step 4 : Ensure indexes
-            self.ensure_indexes()
+            with self.report.stage("ensure_indexes"):
+                self.ensure_indexes()
+
+            # Step 5 (staging mode): replace the live collections with the loaded and indexed ones
+            if config.LOAD_MODE == 'staging':
+                with self.report.stage("swap_collections"):
+                    self.swap_staging_collections()
+            if self.load_checkpoint is not None:
+                self.load_checkpoint.clear()
+            status = "success"
 
         except FileNotFoundError as e:
             logger.error(f"❌ CRITICAL: Source file not found. Aborting pipeline. Error: {e}")
@@ -377,15 +1335,120 @@ class ETLPipeline:
             # Catch any other unexpected errors during the process
             logger.error(f"❌ CRITICAL: An unexpected error occurred during pipeline execution: {e}", exc_info=True)
         finally:
+            self._write_run_marker(status)
+            self.loader.close()
             self.mongo_client.close()
             logger.info("MongoDB connection closed.")
+            self._write_run_report(status, total_inserted_count)
 
         logger.info("======================= PIPELINE END =======================")
         logger.info(f"{total_inserted_count} total documents processed.")
 
+    def ingest_file(self, csv_path, mode):
+        """
+        Extracts, cleans and merges one file of the ingested directory.
+
+        Returns:
+            The rows kept, the documents inserted or updated, the write errors and the duration of the file.
+        """
+        start = time.perf_counter()
+        write_errors = self.write_error_count
+        df = self.extract_clean(csv_path)
+        documents = self.merge(self.iter_documents(df, mode), mode)
+        return {
+            "rows": len(df),
+            "documents": documents,
+            "write_errors": self.write_error_count - write_errors,
+            "duration_s": round(time.perf_counter() - start, 3),
+        }
+
+    def ingest_directory(self, directory):
+        """
+        One pass of directory ingestion: the new or changed CSV files of the directory are
+        processed in parallel (config.INGEST_WORKERS processes) and merged into the collections.
+        A run report and the run marker are only written when some files were processed.
+
+        Returns:
+            The number of documents inserted or updated.
+        """
+        mode = config.DATA_MODELLING_MODE
+        total_written = 0
+        status = "failed"
+        pending = []
+        self.report = RunReport(
+            run_id=uuid.uuid4().hex,
+            deep_memory=config.REPORT_DEEP_MEMORY,
+            source=str(directory),
+            modelling_mode=mode,
+            load_mode="merge",
+        )
+        self.write_error_count = 0
+        try:
+            if mode == 'bucket':
+                # The stays of a new file would have to be appended to the last bucket of each patient
+                raise ValueError("Directory ingestion is not available for the 'bucket' model")
+            ingestor = DirectoryIngestor(self.db, directory, config.INGEST_PATTERN, config.INGEST_SETTLE_SECONDS)
+            with self.report.stage("scan_directory") as stage:
+                pending = ingestor.scan()
+                stage.output(len(pending))
+            if not pending:
+                logger.info(f"No new or changed file in '{directory}'.")
+                return 0
+            logger.info(f"Ingesting {len(pending)} new or changed files from '{directory}' ('{mode}' model)...")
+
+            ingest = ingest_in_worker if config.INGEST_WORKERS > 0 else self.ingest_file
+            with self.report.stage("ingest_files") as stage:
+                results, failed = ingestor.process(pending, ingest, mode, config.INGEST_WORKERS, self.report.context["run_id"])
+                stage.output(sum(result["rows"] for result in results))
+            total_written = sum(result["documents"] for result in results)
+            self.write_error_count += sum(result["write_errors"] for result in results)
+            self.report.context["failed_files"] = failed
+            self.report.context["write_errors"] = self.write_error_count
+            if failed:
+                logger.error(f"❌ {failed} of {len(pending)} files failed or had write errors "
+                             f"({self.write_error_count} documents not written), they are retried by the next scan.")
+
+            with self.report.stage("ensure_indexes"):
+                self.ensure_indexes()
+            if not failed:
+                status = "success"
+        except Exception as e:
+            logger.error(f"❌ CRITICAL: An unexpected error occurred during directory ingestion: {e}", exc_info=True)
+        finally:
+            if pending:
+                self._write_run_marker(status)
+                self._write_run_report(status, total_written)
+        logger.info(f"{total_written} documents inserted or updated from {len(pending)} files.")
+        return total_written
+
+    def run_directory(self, directory, watch_interval=0):
+        """
+        Directory ingestion mode: ingests the new or changed files of the directory once or,
+        with a watch_interval (seconds), scans it again and again until interrupted.
+        """
+        logger.info("=================== DIRECTORY INGESTION START ===================")
+        if config.SUMMARIES_ENABLED:
+            logger.warning("⚠️ Summary collections are not maintained by directory ingestion.")
+        try:
+            while True:
+                self.ingest_directory(directory)
+                if not watch_interval:
+                    break
+                time.sleep(watch_interval)
+        except KeyboardInterrupt:
+            logger.info("Watch loop interrupted.")
+        finally:
+            self.loader.close()
+            self.mongo_client.close()
+            logger.info("MongoDB connection closed.")
+        logger.info("==================== DIRECTORY INGESTION END ====================")
+
 def main():
 
-    if os.path.exists(config.SOURCE_FILE_PATH):
+    if config.SOURCE_MODE == 'directory':
+        etl = ETLPipeline(config=config)
+        etl.run_directory(config.DATA_DIR, config.INGEST_WATCH_INTERVAL)
+    elif os.path.exists(config.SOURCE_FILE_PATH):
         etl = ETLPipeline(config=config)
         etl.run_etl(config.SOURCE_FILE_PATH)
     else:
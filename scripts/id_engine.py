@@ -0,0 +1,78 @@
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Below this number of rows, starting worker processes costs more than it saves
+MIN_ROWS_PER_WORKER = 50_000
+
+
+def _to_key_strings(series):
+    """Vectorized equivalent of str(value) for every value of a column."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        # astype(str) drops the time part when every value is at midnight, str(Timestamp) never does
+        has_fraction = (series.dt.microsecond != 0) | (series.dt.nanosecond != 0)
+        if series.dt.tz is None and not has_fraction.any():
+            iso = np.datetime_as_string(series.to_numpy(), unit="s")
+            return pd.Series(np.char.replace(iso, "T", " "), index=series.index, dtype=object)
+        return series.map(str)
+    return series.astype(str)
+
+
+def build_keys(df, columns):
+    """Builds the '|'-joined key of each row, column by column."""
+    keys = _to_key_strings(df[columns[0]])
+    if len(columns) > 1:
+        keys = keys.str.cat([_to_key_strings(df[col]) for col in columns[1:]], sep="|")
+    return keys
+
+
+def _hash_keys(keys, length):
+    sha256 = hashlib.sha256
+    return [sha256(key.encode()).hexdigest()[:length] for key in keys]
+
+
+def generate_hash_ids(df, columns, length=20, workers=0):
+    """
+    Generates for every row the same id as ETLPipeline._generate_hash_id([row[col] for col in columns]),
+    without building a Series per row.
+
+    Args:
+        df (pd.DataFrame): The DataFrame holding the key columns.
+        columns (list): The key columns, in the order they are concatenated.
+        length (int): Length of the sha256 hexdigest prefix kept as id.
+        workers (int): Number of processes used for hashing (0 or 1 hashes in the current process).
+
+    Returns:
+        A Series of ids aligned on df.index.
+    """
+    columns = list(columns)
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=object)
+
+    ids = hash_keys(build_keys(df, columns).tolist(), length, workers)
+    return pd.Series(ids, index=df.index, dtype=object)
+
+
+def hash_keys(keys, length=20, workers=0):
+    """
+    sha256 hexdigest prefix of each key string, in processes when there are enough keys.
+
+    Returns:
+        A list of ids, in the order of keys.
+    """
+    workers = min(workers, len(keys) // MIN_ROWS_PER_WORKER)
+    if workers > 1:
+        step = -(-len(keys) // workers)
+        batches = [keys[i:i + step] for i in range(0, len(keys), step)]
+        logger.info(f"Hashing {len(keys)} keys with {workers} processes...")
+        # 'spawn': called from transform threads and after polars started its thread pool, a forked
+        # child could inherit a lock held by another thread (pymongo, polars) and deadlock
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor:
+            return [id_ for batch_ids in executor.map(_hash_keys, batches, [length] * len(batches)) for id_ in batch_ids]
+    return _hash_keys(keys, length)
@@ -0,0 +1,283 @@
+"""
+Index advisor: replays the representative queries of config.QUERY_WORKLOAD_PATH with
+explain("executionStats") against the loaded data, reports the documents and keys examined for the
+documents returned and the indexes used, and suggests compound or partial indexes (in the format
+of config.INDEXES) for the queries that scan too much.
+
+The modelling mode is the one of the last run (run marker), unless --mode is given. With --load,
+a CSV is loaded into a scratch database in each mode in turn, so that all of them are analysed at once.
+
+Usage (from the project root):
+    python -m scripts.index_advisor [--mode reference] [--load data/healthcare_dataset.csv] [--mongo-uri mongodb://localhost:27017/]
+"""
+import argparse
+import logging
+import os
+
+from bson import json_util
+from pymongo import MongoClient
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+MODES = ["embedding", "reference", "bucket"]
+# Operators that select single key values, the other ones scan a range of keys
+EQUALITY_OPERATORS = {"$eq", "$in"}
+# Stages reading an index, from the classic and slot-based engines
+INDEX_STAGES = {"IXSCAN", "IDHACK", "EXPRESS_IXSCAN", "EXPRESS_IDHACK", "COUNT_SCAN", "DISTINCT_SCAN"}
+
+
+def load_workload(path=None):
+    """Queries of the workload file (extended JSON, e.g. {"$date": ...} for dates)."""
+    with open(path or config.QUERY_WORKLOAD_PATH) as f:
+        return json_util.loads(f.read())
+
+
+def _path_value(document, path):
+    """Value at a dotted path, first element of the arrays met on the way."""
+    value = document
+    for part in path.split("."):
+        if isinstance(value, list):
+            value = value[0] if value else None
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value[0] if isinstance(value, list) and value else value
+
+
+def resolve_samples(collection, value):
+    """Replaces the {"$sample": path} placeholders of a filter by a value of path found in the collection."""
+    if isinstance(value, dict):
+        if set(value) == {"$sample"}:
+            path = value["$sample"]
+            return _path_value(collection.find_one({path: {"$exists": True}}, [path]) or {}, path)
+        return {key: resolve_samples(collection, item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve_samples(collection, item) for item in value]
+    return value
+
+
+def _plan_stages(plan):
+    yield plan
+    for key in ("inputStage", "outerStage", "innerStage"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def explain(db, query):
+    """Runs the find of a workload query with explain("executionStats") and summarizes its winning plan."""
+    find = {"find": query["collection"], "filter": query["filter"]}
+    if query.get("projection"):
+        find["projection"] = query["projection"]
+    if query.get("sort"):
+        find["sort"] = dict(query["sort"])
+    if query.get("limit"):
+        find["limit"] = query["limit"]
+    explained = db.command({"explain": find, "verbosity": "executionStats"})
+
+    winning_plan = explained["queryPlanner"]["winningPlan"]
+    # Slot-based engine (MongoDB 7+): the plan tree is under queryPlan
+    stages = list(_plan_stages(winning_plan.get("queryPlan", winning_plan)))
+    stats = explained["executionStats"]
+    return {
+        "returned": stats["nReturned"],
+        "docs_examined": stats["totalDocsExamined"],
+        "keys_examined": stats["totalKeysExamined"],
+        "time_ms": stats["executionTimeMillis"],
+        "indexes": [stage.get("indexName", "_id_") for stage in stages if stage["stage"] in INDEX_STAGES],
+        "collscan": any(stage["stage"] == "COLLSCAN" for stage in stages),
+        "in_memory_sort": any(stage["stage"] == "SORT" for stage in stages),
+    }
+
+
+def split_filter(query_filter, prefix=""):
+    """
+    Fields of a filter tested for equality, in the filter order, and range conditions by field.
+    $elemMatch conditions are flattened in dot notation; $or/$and/$expr are not analysed.
+    """
+    equality, ranges = [], {}
+    for field, condition in query_filter.items():
+        if field.startswith("$"):
+            continue
+        path = f"{prefix}{field}"
+        if isinstance(condition, dict) and "$elemMatch" in condition:
+            sub_equality, sub_ranges = split_filter(condition["$elemMatch"], prefix=f"{path}.")
+            equality += sub_equality
+            ranges.update(sub_ranges)
+        elif isinstance(condition, dict) and any(key.startswith("$") for key in condition):
+            if set(condition) <= EQUALITY_OPERATORS:
+                equality.append(path)
+            else:
+                ranges[path] = condition
+        else:
+            equality.append(path)
+    return equality, ranges
+
+
+def suggest_index(collection, query, stats, array_fields=(), max_ratio=10, partial_selectivity=0.1):
+    """
+    Index for a query scanning too much (collection scan, in-memory sort, or more than max_ratio
+    documents examined per document returned), following the Equality, Sort, Range rule.
+    A range condition matching less than partial_selectivity of the collection becomes the filter
+    of a partial index. Queries projecting only indexed fields (without _id) get a covering index.
+
+    Returns:
+        An entry of config.INDEXES, or None when the query is already well served.
+    """
+    ratio = stats["docs_examined"] / max(stats["returned"], 1)
+    if not (stats["collscan"] or stats["in_memory_sort"] or ratio > max_ratio):
+        return None
+    equality, ranges = split_filter(query["filter"])
+    if "_id" in equality:
+        return None
+
+    def in_array(path):
+        return any(path == field or path.startswith(f"{field}.") for field in array_fields)
+
+    partial = None
+    total = collection.estimated_document_count()
+    for field, condition in ranges.items():
+        # A partial filter on a field of an embedded array would index every patient with one matching stay
+        if total and not in_array(field) and collection.count_documents({field: condition}) / total <= partial_selectivity:
+            partial = {field: condition}
+            break
+
+    keys = [[field, 1] for field in equality]
+    keys += [[field, direction] for field, direction in query.get("sort", []) if field not in equality]
+    keys += [[field, 1] for field in ranges if field not in dict(keys) and (partial is None or field not in partial)]
+    if not keys:
+        keys = [[field, 1] for field in partial]
+
+    projection = query.get("projection") or {}
+    if projection.get("_id") == 0 and not any(in_array(field) for field, _ in keys):
+        projected = [field for field, included in projection.items() if included and field != "_id"]
+        if not any(in_array(field) for field in projected):
+            # Covered query: the documents themselves are not fetched (not possible with a multikey index)
+            keys += [[field, 1] for field in projected if field not in dict(keys)]
+
+    spec = {"keys": keys}
+    if partial is not None:
+        spec["partialFilterExpression"] = partial
+    return spec
+
+
+def _is_served_by(spec, index_specs):
+    """True when an existing or already suggested index starts with the keys of spec (and has the same filter)."""
+    for other in index_specs:
+        keys = [list(key) for key in other["keys"]]
+        if keys[:len(spec["keys"])] == spec["keys"] and other.get("partialFilterExpression") == spec.get("partialFilterExpression"):
+            return True
+    return False
+
+
+def existing_indexes(collection):
+    return [
+        {"keys": [[field, direction] for field, direction in info["key"]], "partialFilterExpression": info.get("partialFilterExpression")}
+        for info in collection.index_information().values()
+    ]
+
+
+def analyze(db, workload, mode, max_ratio=10, partial_selectivity=0.1):
+    """
+    Explains the workload queries of a modelling mode on db.
+
+    Returns:
+        The statistics of each query, and the suggested indexes by collection.
+    """
+    array_fields = {
+        'embedding': [config.COLLECTION_HOSPITALIZATIONS],
+        'bucket': [config.COLLECTION_HOSPITALIZATIONS, "recent_hospitalizations"],
+    }.get(mode, [])
+    results, suggestions = [], {}
+    for query in workload:
+        if mode not in query.get("modes", MODES):
+            continue
+        collection = db[query["collection"]]
+        query = {**query, "filter": resolve_samples(collection, query["filter"])}
+        stats = explain(db, query)
+        spec = suggest_index(collection, query, stats, array_fields, max_ratio, partial_selectivity)
+        collection_suggestions = suggestions.setdefault(query["collection"], [])
+        if spec is not None and not _is_served_by(spec, existing_indexes(collection) + collection_suggestions):
+            # A longer suggestion replaces the ones it starts with
+            collection_suggestions[:] = [other for other in collection_suggestions if not _is_served_by(other, [spec])]
+            collection_suggestions.append(spec)
+        results.append({"name": query["name"], "collection": query["collection"], **stats, "suggested": spec})
+    return results, {name: specs for name, specs in suggestions.items() if specs}
+
+
+def print_report(mode, results, suggestions):
+    print(f"\n📊 Query workload, '{mode}' model")
+    print(f"{'query':<48} {'returned':>9} {'docs exam.':>11} {'keys exam.':>11} {'ms':>6}  plan")
+    for result in results:
+        plan = ", ".join(result["indexes"]) or "-"
+        if result["collscan"]:
+            plan += " + COLLSCAN"
+        if result["in_memory_sort"]:
+            plan += " + in-memory SORT"
+        print(f"{result['collection'] + '.' + result['name']:<48} {result['returned']:>9} {result['docs_examined']:>11}"
+              f" {result['keys_examined']:>11} {result['time_ms']:>6}  {plan}")
+
+    if not suggestions:
+        print("✅ Every query is served by an index.")
+        return
+    print(f"\n⚙️ Suggested indexes ('{mode}' model), entries for config.INDEXES/EMBEDDING_INDEXES/BUCKET_INDEXES:")
+    for collection_name, specs in suggestions.items():
+        for spec in specs:
+            print(f"  {collection_name}: {json_util.dumps(spec)}")
+
+
+def load_source(client, database, csv_path, mode):
+    """Loads csv_path into database in the given modelling mode, with the indexes of the config."""
+    # Imported here: scripts.etl configures the logs (logs/etl_pipeline.log) as soon as it is imported
+    from scripts.etl import ETLPipeline
+
+    os.environ["MONGO_DATABASE"] = database
+    config.DATA_MODELLING_MODE = mode
+    pipeline = ETLPipeline(config)
+    client.drop_database(database)
+    pipeline.load(pipeline.build_documents(pipeline.clean(pipeline.extract(csv_path)), mode))
+    pipeline.ensure_indexes()
+    pipeline.mongo_client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workload", default=config.QUERY_WORKLOAD_PATH, help="Query workload file")
+    parser.add_argument("--mode", choices=MODES, help="Modelling mode of the loaded data (default: the one of the last run)")
+    parser.add_argument("--load", metavar="CSV", help="Load this file into a scratch database in every mode and analyse each of them")
+    parser.add_argument("--mongo-uri", default=config.MONGO_URI)
+    parser.add_argument("--database", default=config.MONGO_DB)
+    parser.add_argument("--max-ratio", type=float, default=10, help="Documents examined per document returned above which an index is suggested")
+    parser.add_argument("--partial-selectivity", type=float, default=0.1,
+                        help="Range conditions matching less than this fraction of a collection become partial index filters")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    config.MONGO_URI = args.mongo_uri
+    client = MongoClient(args.mongo_uri)
+    workload = load_workload(args.workload)
+    if args.load:
+        database = f"{args.database}_index_advisor"
+        modes = [args.mode] if args.mode else MODES
+    else:
+        database = args.database
+        marker = client[database][config.RUN_MARKER_COLLECTION].find_one({"_id": config.RUN_MARKER_ID}) or {}
+        modes = [args.mode or marker.get("modelling_mode", config.DATA_MODELLING_MODE)]
+
+    try:
+        for mode in modes:
+            if args.load:
+                load_source(client, database, args.load, mode)
+            results, suggestions = analyze(client[database], workload, mode, args.max_ratio, args.partial_selectivity)
+            print_report(mode, results, suggestions)
+    finally:
+        if args.load:
+            client.drop_database(database)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
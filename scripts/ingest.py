@@ -0,0 +1,136 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+
+from config import config
+from scripts.checkpoint import file_checksum
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SourceFile:
+    """A new or changed file of the ingested directory."""
+    path: Path
+    size: int
+    mtime: float
+    checksum: str
+
+
+def ingest_in_worker(path, mode):
+    """Extracts, cleans and merges one file in a worker process, with its own MongoClient."""
+    # Imported here: scripts.etl imports this module
+    from scripts.etl import ETLPipeline
+
+    pipeline = ETLPipeline(config)
+    try:
+        return pipeline.ingest_file(path, mode)
+    finally:
+        pipeline.mongo_client.close()
+
+
+class DirectoryIngestor:
+    """
+    Ingestion of the CSV files dropped into a directory (e.g. daily deltas of each hospital).
+    The manifest collection keeps one document per processed file, with its size, modification
+    time and checksum: a file is only processed again when its content changes. Files whose
+    size and mtime are unchanged are not even read, and a file touched without being changed
+    only gets its manifest entry updated.
+    """
+
+    def __init__(self, db, directory, pattern="*.csv", settle_seconds=5):
+        self.manifest = db[config.MANIFEST_COLLECTION]
+        self.directory = Path(directory)
+        self.pattern = pattern
+        # Files modified more recently are probably still being copied, they wait for the next scan
+        self.settle_seconds = settle_seconds
+
+    def scan(self):
+        """
+        Returns:
+            The SourceFile of every new or changed file, by name.
+        """
+        manifest = {entry["_id"]: entry for entry in self.manifest.find({"status": "done"})}
+        pending = []
+        for path in sorted(self.directory.glob(self.pattern)):
+            stat = path.stat()
+            if time.time() - stat.st_mtime < self.settle_seconds:
+                logger.info(f"   ⏱️ '{path.name}' was modified less than {self.settle_seconds}s ago, left for the next scan.")
+                continue
+            entry = manifest.get(path.name)
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                continue
+            checksum = file_checksum(path)
+            if entry and entry["checksum"] == checksum:
+                self.manifest.update_one({"_id": path.name}, {"$set": {"size": stat.st_size, "mtime": stat.st_mtime}})
+                continue
+            pending.append(SourceFile(path, stat.st_size, stat.st_mtime, checksum))
+        return pending
+
+    def _mark(self, source_file, status, **fields):
+        self.manifest.update_one(
+            {"_id": source_file.path.name},
+            {"$set": {
+                "size": source_file.size,
+                "mtime": source_file.mtime,
+                "checksum": source_file.checksum,
+                "status": status,
+                "updated_at": datetime.now(timezone.utc),
+                **fields,
+            }},
+            upsert=True,
+        )
+
+    def process(self, pending, ingest, mode, workers=0, run_id=None):
+        """
+        Runs ingest(path, mode) for every pending file, in a pool of workers processes
+        (in the current process when workers is 0), and records the outcome in the manifest.
+        A failed file, or a file whose merge had write errors ('partial'), stays out of the manifest
+        'done' entries and is retried by the next scan: merges by _id make the retry harmless.
+
+        Returns:
+            The results of ingest for the files processed (partial ones included), and the number
+            of failed and partial files.
+        """
+        for source_file in pending:
+            self._mark(source_file, "processing", run_id=run_id)
+
+        results, failed = [], 0
+
+        def record(source_file, outcome):
+            nonlocal failed
+            if isinstance(outcome, Exception):
+                failed += 1
+                logger.error(f"   ❌ '{source_file.path.name}' could not be ingested: {outcome}")
+                self._mark(source_file, "failed", error=str(outcome))
+                return
+            results.append(outcome)
+            if outcome["write_errors"]:
+                failed += 1
+                logger.error(f"   ❌ '{source_file.path.name}': {outcome['write_errors']} documents could not be written, "
+                             f"{outcome['documents']} inserted or updated, left for the next scan")
+                self._mark(source_file, "partial", error=f"{outcome['write_errors']} write errors", **outcome)
+                return
+            logger.info(f"   ✅ '{source_file.path.name}': {outcome['rows']} rows, {outcome['documents']} documents "
+                        f"inserted or updated in {outcome['duration_s']:.1f}s")
+            self._mark(source_file, "done", processed_at=datetime.now(timezone.utc), error=None, **outcome)
+
+        if workers <= 0:
+            for source_file in pending:
+                try:
+                    outcome = ingest(source_file.path, mode)
+                except Exception as e:
+                    outcome = e
+                record(source_file, outcome)
+            return results, failed
+
+        # 'spawn': the pymongo clients of the parent must not be inherited by the workers
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as executor:
+            futures = {executor.submit(ingest, source_file.path, mode): source_file for source_file in pending}
+            for future in as_completed(futures):
+                record(futures[future], future.exception() or future.result())
+        return results, failed
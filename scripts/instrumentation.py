@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb():
+    """Peak resident memory of the process so far (ru_maxrss is in KB on Linux)."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class StageRecord:
+    """Measures of one stage, summed over its calls (one call per chunk in streaming mode)."""
+    name: str
+    calls: int = 0
+    duration_s: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    df_memory_mb: float = 0.0
+    peak_rss_mb: float = 0.0
+
+
+class StageMeasure:
+    """Handle yielded by RunReport.stage() to give the stage output."""
+
+    def __init__(self, rows_in):
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.df_memory_mb = None
+
+    def output(self, result, deep_memory=False):
+        """Records the rows (DataFrame, list of documents or count) produced by the stage."""
+        if hasattr(result, "memory_usage"):
+            self.df_memory_mb = result.memory_usage(deep=deep_memory).sum() / 1_048_576
+        self.rows_out = result if isinstance(result, int) else len(result)
+
+
+class RunReport:
+    """
+    Collects duration, rows in/out, DataFrame memory and process peak memory of each stage of a run,
+    and writes them as a JSON line (and optionally a Prometheus textfile) at the end of the run.
+    """
+
+    def __init__(self, deep_memory=False, **context):
+        self.deep_memory = deep_memory
+        self.context = context
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.stages = {}
+        # Stages of the pipelined mode are measured from several threads
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Times the enclosed block. rows_in may be a DataFrame, a list or a number of rows.
+
+            with report.stage("dedup_full", df) as stage:
+                df = df.drop_duplicates()
+                stage.output(df)
+        """
+        if rows_in is not None and not isinstance(rows_in, int):
+            rows_in = len(rows_in)
+        measure = StageMeasure(rows_in)
+        start = time.perf_counter()
+        try:
+            yield measure
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                record = self.stages.setdefault(name, StageRecord(name))
+                record.calls += 1
+                record.duration_s += duration
+                record.rows_in += measure.rows_in or 0
+                record.rows_out += measure.rows_out or 0
+                record.df_memory_mb = max(record.df_memory_mb, measure.df_memory_mb or 0.0)
+                record.peak_rss_mb = peak_rss_mb() or 0.0
+            logger.debug(f"⏱️ {name}: {duration:.3f}s, rows {measure.rows_in} → {measure.rows_out}")
+
+    def summary(self, status, documents):
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration_s": round(time.perf_counter() - self._start, 3),
+            "status": status,
+            "documents": documents,
+            "peak_rss_mb": peak_rss_mb(),
+            **self.context,
+            "stages": [asdict(record) for record in self.stages.values()],
+        }
+
+    def write(self, report_dir, status, documents, prometheus=False):
+        """Appends the run to etl_run_reports.jsonl and optionally rewrites etl_pipeline.prom."""
+        report_dir = Path(report_dir)
+        report_dir.mkdir(parents=True, exist_ok=True)
+        summary = self.summary(status, documents)
+
+        report_path = report_dir / "etl_run_reports.jsonl"
+        with open(report_path, "a") as f:
+            f.write(json.dumps(summary, default=str) + "\n")
+        logger.info(f"Run report appended to '{report_path}'.")
+
+        for record in self.stages.values():
+            logger.info(f"   ⏱️ {record.name:<22} {record.duration_s:8.3f}s  rows {record.rows_in} → {record.rows_out}"
+                        f"  peak RSS {record.peak_rss_mb:.0f} MB")
+
+        if prometheus:
+            self._write_prometheus(report_dir / "etl_pipeline.prom", summary)
+
+    @staticmethod
+    def _write_prometheus(path, summary):
+        """Textfile for the node_exporter textfile collector, replaced atomically."""
+        lines = [
+            "# HELP etl_run_duration_seconds Wall time of the last ETL run.",
+            "# TYPE etl_run_duration_seconds gauge",
+            f"etl_run_duration_seconds {summary['duration_s']}",
+            "# HELP etl_run_success 1 if the last ETL run succeeded.",
+            "# TYPE etl_run_success gauge",
+            f"etl_run_success {int(summary['status'] == 'success')}",
+            "# HELP etl_run_documents Documents written by the last ETL run.",
+            "# TYPE etl_run_documents gauge",
+            f"etl_run_documents {summary['documents']}",
+            "# HELP etl_run_peak_rss_bytes Peak resident memory of the last ETL run.",
+            "# TYPE etl_run_peak_rss_bytes gauge",
+            f"etl_run_peak_rss_bytes {int((summary['peak_rss_mb'] or 0) * 1_048_576)}",
+        ]
+        metrics = {
+            "etl_stage_duration_seconds": ("duration_s", "Wall time of the stage."),
+            "etl_stage_rows_in": ("rows_in", "Rows entering the stage."),
+            "etl_stage_rows_out": ("rows_out", "Rows produced by the stage."),
+            "etl_stage_peak_rss_megabytes": ("peak_rss_mb", "Process peak memory at the end of the stage."),
+        }
+        for metric, (field, help_text) in metrics.items():
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+            lines += [f'{metric}{{stage="{stage["name"]}"}} {stage[field]}' for stage in summary["stages"]]
+
+        tmp_path = path.with_suffix(".prom.tmp")
+        tmp_path.write_text("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+        logger.info(f"Prometheus metrics written to '{path}'.")
@@ -0,0 +1,313 @@
+import logging
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field, asdict
+from itertools import count, islice
+from multiprocessing import get_context
+
+from bson.raw_bson import RawBSONDocument
+from pymongo import MongoClient, WriteConcern
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+@dataclass
+class LoadResult:
+    """Counts of one loader call, with the write errors of the failed batches."""
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    errors: list = field(default_factory=list)
+
+    def add(self, other):
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.deleted += other.deleted
+        self.errors.extend(other.errors)
+
+
+def batched(items, batch_size):
+    """Splits any iterable into lists of batch_size items."""
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def parse_write_concern(value):
+    """'majority' stays a string, a number of nodes becomes an int."""
+    return int(value) if str(value).isdigit() else value
+
+
+class BatchLoader:
+    """
+    Writes documents into MongoDB by batches, concurrently from a pool of threads.
+    All threads share the connection pool of the pipeline's MongoClient, and batches are
+    sent unordered so that one bad document does not stop the rest of its batch.
+    """
+
+    def __init__(self, db, workers=4, batch_size=10_000, write_concern="1"):
+        self.db = db
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.write_concern = WriteConcern(w=parse_write_concern(write_concern))
+
+    def insert(self, collection_name, records):
+        """Inserts records (any iterable of documents) with unordered insert_many batches."""
+        return self.insert_batches(collection_name, batched(records, self.batch_size))
+
+    def insert_batches(self, collection_name, batches, committed=None, on_commit=None):
+        """
+        Inserts already batched documents (e.g. produced lazily by ETLPipeline.iter_documents).
+
+        Args:
+            committed (dict, optional): Resumed load, sizes of the batches written by an interrupted
+                run by batch number (from 1): batches holds the other ones only, in order, and these
+                are counted as inserted. The other batches may have been partly written before the
+                interruption, their duplicate-key errors are counted as insertions.
+            on_commit (callable, optional): on_commit(batch_number, size) is called once a batch
+                is entirely written.
+        """
+        def write(collection, batch):
+            try:
+                return LoadResult(inserted=len(collection.insert_many(batch, ordered=False).inserted_ids))
+            except BulkWriteError as e:
+                inserted, errors = e.details.get("nInserted", 0), e.details.get("writeErrors", [])
+                if committed is not None:
+                    replayed = [error for error in errors if error.get("code") == DUPLICATE_KEY_ERROR]
+                    inserted += len(replayed)
+                    errors = [error for error in errors if error.get("code") != DUPLICATE_KEY_ERROR]
+                return LoadResult(inserted=inserted, errors=errors)
+
+        return self._run(collection_name, batches, write, skip=committed, on_commit=on_commit)
+
+    def bulk_write(self, collection_name, operations):
+        """Sends write operations (InsertOne, ReplaceOne, ...) as unordered bulk_write batches."""
+        def write(collection, batch):
+            try:
+                result = collection.bulk_write(batch, ordered=False)
+                # Upserts that created a document count as insertions
+                return LoadResult(result.inserted_count + result.upserted_count, result.modified_count, result.deleted_count)
+            except BulkWriteError as e:
+                details = e.details
+                return LoadResult(details.get("nInserted", 0) + details.get("nUpserted", 0), details.get("nModified", 0),
+                                  details.get("nRemoved", 0), details.get("writeErrors", []))
+
+        return self._run(collection_name, batched(operations, self.batch_size), write)
+
+    def _run(self, collection_name, batches, write, skip=None, on_commit=None):
+        """
+        Runs write(collection, batch) for every batch, keeping at most 2 batches per worker in flight.
+        The batches whose number is in skip ({batch number: size}) are not in batches: their numbers
+        are passed over and their documents counted as inserted.
+        """
+        skip = skip or {}
+        collection = self.db[collection_name].with_options(write_concern=self.write_concern)
+        total = LoadResult()
+        start = time.perf_counter()
+
+        def timed_write(batch_number, batch):
+            batch_start = time.perf_counter()
+            result = write(collection, batch)
+            elapsed = time.perf_counter() - batch_start
+            logger.info(f"   '{collection_name}' batch {batch_number}: {len(batch)} docs in {elapsed:.2f}s "
+                        f"({len(batch) / elapsed if elapsed else 0:,.0f} docs/s)")
+            if result.errors:
+                logger.error(f"   ❌ '{collection_name}' batch {batch_number}: {len(result.errors)} write errors, "
+                             f"first one: {result.errors[0].get('errmsg')}")
+            elif on_commit is not None:
+                on_commit(batch_number, len(batch))
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="loader") as executor:
+            pending = set()
+            batch_numbers = (number for number in count(1) if number not in skip)
+            for batch, batch_number in zip(batches, batch_numbers):
+                if len(pending) >= 2 * self.workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        total.add(future.result())
+                pending.add(executor.submit(timed_write, batch_number, batch))
+            for future in pending:
+                total.add(future.result())
+
+        elapsed = time.perf_counter() - start
+        written = total.inserted + total.updated + total.deleted
+        logger.info(f"   '{collection_name}': {written} documents written in {elapsed:.2f}s "
+                    f"({written / elapsed if elapsed else 0:,.0f} docs/s) by {self.workers} workers")
+        skipped = sum(skip.values())
+        if skipped:
+            logger.info(f"   '{collection_name}': {skipped} documents of batches written by a previous run skipped.")
+            total.inserted += skipped
+        return total
+
+    def close(self):
+        """Nothing to release: the threads of each call are joined before it returns."""
+
+
+@dataclass
+class PartitionProgress:
+    """Documents written into one partition of a collection, and the time its worker spent writing them."""
+    collection: str
+    partition: int
+    process: int = None
+    documents: int = 0
+    batches: int = 0
+    errors: int = 0
+    write_s: float = 0.0
+
+    @property
+    def docs_per_s(self):
+        return self.documents / self.write_s if self.write_s else 0.0
+
+
+# Database of a partition worker process, opened by _connect_worker
+_worker_db = None
+
+
+def _connect_worker(mongo_uri, database):
+    """Initializer of a partition worker: its own MongoClient, never shared with the parent process."""
+    global _worker_db
+    _worker_db = MongoClient(mongo_uri)[database]
+
+
+def _write_partition(collection_name, partition, documents, write_concern):
+    """Inserts a batch of one partition (runs in a worker process)."""
+    start = time.perf_counter()
+    collection = _worker_db[collection_name].with_options(write_concern=WriteConcern(w=parse_write_concern(write_concern)))
+    batch = [RawBSONDocument(document) if isinstance(document, bytes) else document for document in documents]
+    try:
+        result = LoadResult(inserted=len(collection.insert_many(batch, ordered=False).inserted_ids))
+    except BulkWriteError as e:
+        # The failed documents are not sent back to the parent process
+        errors = [{key: value for key, value in error.items() if key != "op"} for error in e.details.get("writeErrors", [])]
+        result = LoadResult(inserted=e.details.get("nInserted", 0), errors=errors)
+    return partition, result, time.perf_counter() - start, os.getpid()
+
+
+def id_bytes(document):
+    """The _id of a document as bytes, read without decoding a RawBSONDocument whose _id is a leading string."""
+    if isinstance(document, RawBSONDocument):
+        raw = document.raw
+        # Element type 0x02 (string) named '_id', then the int32 length of the string and its bytes
+        if raw[4:9] == b"\x02_id\x00":
+            length = int.from_bytes(raw[9:13], "little")
+            return raw[13:13 + length - 1]
+    return str(document["_id"]).encode()
+
+
+class PartitionedLoader(BatchLoader):
+    """
+    BatchLoader whose inserts are spread over worker processes, for sharded clusters: documents are
+    split into `partitions` partitions by a hash of their _id, partition p being always written by
+    worker process p % processes, with its own MongoClient. BSON encoding and network writes then
+    scale with the processes instead of sharing one interpreter. Pre-encoded documents
+    (RawBSONDocument) are sent to the workers as bytes.
+    bulk_write (incremental load, merges) is not partitioned and runs in the current process.
+    """
+
+    def __init__(self, db, mongo_uri, partitions=8, processes=4, workers=4, batch_size=10_000, write_concern="1"):
+        super().__init__(db, workers, batch_size, write_concern)
+        self.mongo_uri = mongo_uri
+        self.partitions = max(1, partitions)
+        self.processes = max(1, min(processes, self.partitions))
+        self.write_concern_value = write_concern
+        self.progress = {}
+        self._executors = None
+
+    def partition_of(self, document):
+        return zlib.crc32(id_bytes(document)) % self.partitions
+
+    def _start(self):
+        if self._executors is None:
+            logger.info(f"Starting {self.processes} load processes for {self.partitions} partitions...")
+            # 'spawn': the pymongo client of the parent must not be inherited by the workers
+            self._executors = [
+                ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"), initializer=_connect_worker,
+                                    initargs=(self.mongo_uri, self.db.name))
+                for _ in range(self.processes)
+            ]
+        return self._executors
+
+    def _record(self, collection_name, partition, result, elapsed, process):
+        progress = self.progress.setdefault((collection_name, partition), PartitionProgress(collection_name, partition))
+        progress.process = process
+        progress.documents += result.inserted
+        progress.batches += 1
+        progress.errors += len(result.errors)
+        progress.write_s += elapsed
+        logger.info(f"   '{collection_name}' partition {partition} (process {process}): {result.inserted} docs in {elapsed:.2f}s "
+                    f"({result.inserted / elapsed if elapsed else 0:,.0f} docs/s), {progress.documents} so far")
+        if result.errors:
+            logger.error(f"   ❌ '{collection_name}' partition {partition}: {len(result.errors)} write errors, "
+                         f"first one: {result.errors[0].get('errmsg')}")
+        return result
+
+    def insert_batches(self, collection_name, batches, committed=None, on_commit=None):
+        """
+        Inserts already batched documents, regrouped by partition into batches of batch_size documents.
+        Each worker process has at most 2 batches in flight, which bounds the memory held by the parent.
+        """
+        if committed is not None or on_commit is not None:
+            raise ValueError("Resumable loads are not available with partitioned loads")
+        executors = self._start()
+        buffers = [[] for _ in range(self.partitions)]
+        pending = [set() for _ in executors]
+        total = LoadResult()
+        start = time.perf_counter()
+
+        def collect(futures):
+            for future in futures:
+                total.add(self._record(collection_name, *future.result()))
+
+        def submit(partition):
+            process = partition % len(executors)
+            if len(pending[process]) >= 2:
+                done, pending[process] = wait(pending[process], return_when=FIRST_COMPLETED)
+                collect(done)
+            pending[process].add(executors[process].submit(
+                _write_partition, collection_name, partition, buffers[partition], self.write_concern_value))
+            buffers[partition] = []
+
+        for batch in batches:
+            for document in batch:
+                partition = self.partition_of(document)
+                buffers[partition].append(document.raw if isinstance(document, RawBSONDocument) else document)
+                if len(buffers[partition]) >= self.batch_size:
+                    submit(partition)
+        for partition, buffer in enumerate(buffers):
+            if buffer:
+                submit(partition)
+        for futures in pending:
+            collect(futures)
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"   '{collection_name}': {total.inserted} documents written in {elapsed:.2f}s "
+                    f"({total.inserted / elapsed if elapsed else 0:,.0f} docs/s) by {len(executors)} processes, "
+                    f"{self.partitions} partitions")
+        return total
+
+    def report(self):
+        """
+        Returns:
+            The progress of every partition written so far, with its throughput (documents per second of writing).
+        """
+        return [{**asdict(progress), "docs_per_s": round(progress.docs_per_s)} for progress in self.progress.values()]
+
+    def log_report(self):
+        logger.info("📊 Partitioned load:")
+        for progress in self.progress.values():
+            logger.info(f"   {progress.collection + ' #' + str(progress.partition):<32} process {progress.process}: "
+                        f"{progress.documents:>9} docs in {progress.batches:>4} batches, {progress.write_s:8.2f}s writing, "
+                        f"{progress.docs_per_s:>9,.0f} docs/s, {progress.errors} errors")
+
+    def close(self):
+        """Stops the worker processes (and their MongoClient)."""
+        if self._executors is not None:
+            for executor in self._executors:
+                executor.shutdown()
+            self._executors = None
@@ -0,0 +1,63 @@
+import pandas as pd
+
+from config import config
+
+# Same keys, in the same order, as ETLPipeline._parse_name
+NAME_FIELDS = ["full", "title", "suffix", "first", "last"]
+
+
+def parse_name_table(names):
+    """
+    Parses distinct names once, with the same rules as ETLPipeline._parse_name.
+
+    Args:
+        names: The distinct (already title-cased) names, e.g. the categories of the Name column.
+
+    Returns:
+        A DataFrame indexed by name with one column per NAME_FIELDS entry (None when absent).
+    """
+    full = pd.Series(pd.Index(names), index=pd.Index(names), dtype=object)
+    tokens = full.str.split()
+    token_count = tokens.str.len()
+    first_token, last_token = tokens.str[0], tokens.str[-1]
+
+    has_title = first_token.isin(config.NAME_PREFIXES)
+    # A single token already taken as title cannot be a suffix too
+    has_suffix = (token_count > has_title) & last_token.isin(config.NAME_SUFFIXES)
+
+    # Remaining tokens once title and suffix are removed
+    starts = has_title.astype(int).tolist()
+    ends = (token_count - has_suffix.astype(int)).tolist()
+    remaining = [parts[start:end] for parts, start, end in zip(tokens.tolist(), starts, ends)]
+
+    return pd.DataFrame({
+        "full": full,
+        "title": first_token.astype(object).where(has_title, None),
+        "suffix": last_token.astype(object).where(has_suffix, None),
+        "first": [parts[0] if parts else None for parts in remaining],
+        "last": [" ".join(parts[1:]) if len(parts) >= 2 else None for parts in remaining],
+    }, index=full.index, columns=NAME_FIELDS)
+
+
+def name_documents(names, name_table=None):
+    """
+    Builds the 'name' sub-document of each row from a categorical Name column.
+    Each distinct name is converted once, rows are mapped back through the category codes.
+
+    Args:
+        names (pd.Series): Categorical Series of names.
+        name_table (pd.DataFrame, optional): Output of parse_name_table for names.cat.categories.
+            Parsed again when missing or built for other categories.
+
+    Returns:
+        A list with one dict per row (None for missing names).
+    """
+    categories = names.cat.categories
+    if name_table is None or not name_table.index.equals(categories):
+        name_table = parse_name_table(categories)
+
+    documents = [
+        {field: value for field, value in zip(NAME_FIELDS, row) if value is not None}
+        for row in name_table.itertuples(index=False, name=None)
+    ]
+    return [dict(documents[code]) if code >= 0 else None for code in names.cat.codes.tolist()]
@@ -0,0 +1,173 @@
+import copy
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from pymongo import MongoClient
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# One MongoClient (and its connection pool) per URI for the whole process
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(uri=None):
+    """Shared MongoClient of the process for uri (config.MONGO_URI by default)."""
+    uri = uri or config.MONGO_URI
+    with _clients_lock:
+        if uri not in _clients:
+            _clients[uri] = MongoClient(uri)
+        return _clients[uri]
+
+
+class LRUCache:
+    """Thread-safe least recently used cache, whose entries also expire after ttl seconds."""
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (True, value) for a live entry, (False, None) otherwise."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PatientLookup:
+    """
+    Read access to the loaded patients by the indexed fields, through the shared client and an
+    in-process LRU cache. The cache is dropped as soon as the run marker written by
+    ETLPipeline.run_etl changes, i.e. after every reload (checked at most every check_interval seconds).
+
+        lookup = PatientLookup()
+        patient = lookup.by_id("4f1c...", projection=["name", "blood_type"])
+    """
+
+    def __init__(self, client=None, database=None, max_size=None, ttl=None, check_interval=None):
+        self.client = client or get_client()
+        self.db = self.client[database or config.MONGO_DB]
+        self.cache = LRUCache(
+            config.LOOKUP_CACHE_SIZE if max_size is None else max_size,
+            config.LOOKUP_CACHE_TTL if ttl is None else ttl,
+        )
+        self.check_interval = config.LOOKUP_MARKER_CHECK_INTERVAL if check_interval is None else check_interval
+        self._marker = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _current_marker(self):
+        """Run marker of the last ETL run, read again when check_interval has elapsed."""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is None or now - self._checked_at >= self.check_interval:
+                marker = self.db[config.RUN_MARKER_COLLECTION].find_one({"_id": config.RUN_MARKER_ID}) or {}
+                if self._checked_at is not None and marker.get("run_id") != self._marker.get("run_id"):
+                    logger.info(f"New ETL run '{marker.get('run_id')}', lookup cache cleared.")
+                    self.cache.clear()
+                self._marker, self._checked_at = marker, now
+            return self._marker
+
+    @staticmethod
+    def _projection_key(projection):
+        if projection is None:
+            return None
+        if isinstance(projection, dict):
+            return tuple(sorted(projection.items()))
+        return tuple(sorted(projection))
+
+    def _cached(self, key, projection, query):
+        """Runs query() on a cache miss; callers get their own copy of the cached result."""
+        self._current_marker()
+        key = key + (self._projection_key(projection),)
+        found, value = self.cache.get(key)
+        if not found:
+            value = query()
+            self.cache.put(key, value)
+        return copy.deepcopy(value)
+
+    def by_id(self, patient_id, projection=None):
+        """The patient with this _id, or None."""
+        patients = self.db[config.COLLECTION_PATIENTS]
+        return self._cached(("by_id", patient_id), projection,
+                            lambda: patients.find_one({"_id": patient_id}, projection))
+
+    def by_last_name(self, last_name, projection=None, limit=100):
+        """Patients whose name.last is last_name (index on name.last)."""
+        patients = self.db[config.COLLECTION_PATIENTS]
+        return self._cached(("by_last_name", last_name, limit), projection,
+                            lambda: list(patients.find({"name.last": last_name}, projection).limit(limit)))
+
+    def _patients_with_condition(self, collection_name, condition, blood_type, projection, limit):
+        """
+        Patients of a blood type referenced (patient_id) by documents of collection_name matching
+        condition, in one aggregation: the ids are never sent back and forth, so that a common
+        condition cannot build a distinct result or an $in list over the 16 MB document limit.
+        """
+        pipeline = [
+            {"$match": condition},
+            {"$group": {"_id": "$patient_id"}},
+            # $lookup + $unwind + $match on the joined field are coalesced by the server: the
+            # blood type is matched in the lookup itself, by _id, and patients of other types never come back
+            {"$lookup": {"from": config.COLLECTION_PATIENTS, "localField": "_id", "foreignField": "_id", "as": "patient"}},
+            {"$unwind": "$patient"},
+            {"$match": {"patient.blood_type": blood_type}},
+            {"$limit": limit},
+            {"$replaceRoot": {"newRoot": "$patient"}},
+        ]
+        if projection is not None:
+            pipeline.append({"$project": projection if isinstance(projection, dict) else {field: 1 for field in projection}})
+        return list(self.db[collection_name].aggregate(pipeline, allowDiskUse=True))
+
+    def by_blood_type_and_condition(self, blood_type, medical_condition, projection=None, limit=100):
+        """
+        Patients of a blood type with at least one hospitalization for medical_condition,
+        in any modelling mode (the mode of the last run is read from the run marker).
+        """
+        marker = self._current_marker()
+        patients = self.db[config.COLLECTION_PATIENTS]
+
+        def query():
+            mode = marker.get("modelling_mode", config.DATA_MODELLING_MODE)
+            if mode == 'reference':
+                return self._patients_with_condition(
+                    config.COLLECTION_HOSPITALIZATIONS, {"medical_condition": medical_condition}, blood_type, projection, limit)
+            if mode == 'bucket':
+                return self._patients_with_condition(
+                    config.COLLECTION_HOSPITALIZATION_BUCKETS,
+                    {f"{config.COLLECTION_HOSPITALIZATIONS}.medical_condition": medical_condition}, blood_type, projection, limit)
+            criteria = {"blood_type": blood_type,
+                        f"{config.COLLECTION_HOSPITALIZATIONS}.medical_condition": medical_condition}
+            return list(patients.find(criteria, projection).limit(limit))
+
+        return self._cached(("by_blood_type_and_condition", blood_type, medical_condition, limit), projection, query)
@@ -0,0 +1,97 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a queue
+END = object()
+
+
+class StageCancelled(Exception):
+    """Raised inside a stage when another stage failed and the run is being stopped."""
+
+
+class StageRunner:
+    """
+    Runs the stages of a pipeline in threads connected by bounded queues.
+    A full queue blocks its producer (back-pressure), so that at most queue_size items wait
+    between two stages. The first error raised by a stage stops all the others, and is raised
+    again by join() in the calling thread.
+    """
+
+    def __init__(self, queue_size=2, poll_interval=0.1):
+        self.queue_size = max(1, queue_size)
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+        self.errors = []
+        self._threads = []
+
+    def queue(self):
+        return queue.Queue(maxsize=self.queue_size)
+
+    def put(self, q, item):
+        """Blocks while the queue is full, unless the run is stopped."""
+        while True:
+            self.check()
+            try:
+                q.put(item, timeout=self.poll_interval)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, q):
+        """Blocks until an item is available, unless the run is stopped."""
+        while True:
+            self.check()
+            try:
+                return q.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+
+    def check(self):
+        if self.stopped.is_set():
+            raise StageCancelled()
+
+    def start(self, name, target, *args):
+        """Runs target(*args) in a new thread, stopping the whole run if it fails."""
+        def run():
+            try:
+                target(*args)
+            except StageCancelled:
+                logger.info(f"   Stage '{name}' cancelled.")
+            except BaseException as e:
+                logger.error(f"❌ Stage '{name}' failed: {e}")
+                self.errors.append(e)
+                self.stopped.set()
+
+        thread = threading.Thread(target=run, name=name, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def join(self):
+        """Waits for every stage and raises the first error, if any."""
+        for thread in self._threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+
+class Turnstile:
+    """Lets concurrent workers run one section in the order of their chunk numbers (0, 1, 2, ...)."""
+
+    def __init__(self, runner):
+        self.runner = runner
+        self.next_number = 0
+        self._condition = threading.Condition()
+
+    def wait_turn(self, number):
+        with self._condition:
+            while self.next_number != number:
+                self.runner.check()
+                self._condition.wait(timeout=self.runner.poll_interval)
+
+    def done(self):
+        with self._condition:
+            self.next_number += 1
+            self._condition.notify_all()
@@ -0,0 +1,210 @@
+import io
+import logging
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from config import config
+from scripts.id_engine import hash_keys
+from scripts.name_parser import parse_name_table
+
+logger = logging.getLogger(__name__)
+
+# Polars type of each config.SOURCE_SCHEMA dtype. Dates are read as text and parsed with
+# config.SOURCE_DATE_FORMAT, floats are read as text and parsed like pd.read_csv does (see
+# _parse_floats), categories are only built when converting to pandas.
+POLARS_DTYPES = {
+    "object": pl.String,
+    "category": pl.String,
+    "Int8": pl.Int8,
+    "Int16": pl.Int16,
+    "float64": pl.String,
+    "datetime64[ns]": pl.String,
+}
+# Sign, integer digits, decimal digits and exponent of a decimal number
+FLOAT_PATTERN = r"^\s*([+-]?)([0-9]*)(?:\.([0-9]*))?(?:[eE]([+-]?[0-9]+))?\s*$"
+# Significant digits kept by the pandas parser, and its table of powers of ten
+MAX_DIGITS = 17
+POWERS_OF_TEN = np.array([float(f"1e{exponent}") for exponent in range(309)])
+# Values of each batch also parsed by pd.read_csv, to detect a change of its converter
+CHECKED_FLOATS = 1000
+# Text columns: a missing value is 'nan' in the patient keys, as str(np.nan) with the pandas engine
+TEXT_DTYPES = {"object", "category"}
+ROW_INDEX = "__row"
+PATIENT_KEY = "__patient_key"
+
+
+def _category_columns():
+    return ["Name"] + [col for col, dtype in config.SOURCE_SCHEMA.items() if dtype == "category" and col != "Name"]
+
+
+def _date_columns():
+    return [col for col, dtype in config.SOURCE_SCHEMA.items() if dtype.startswith("datetime")]
+
+
+def _parse_floats(texts):
+    """
+    Parses decimal numbers to the same float64 values as the default converter of pd.read_csv,
+    which is not correctly rounded: up to 17 significant digits are accumulated in a float, then
+    scaled by a power of ten. For 17-digit values the result can differ by one unit in the last
+    place from the one of polars, and the difference can survive rounding to cents. A sample of
+    the values is checked against pd.read_csv (_check_floats).
+    """
+    parts = texts.str.extract_groups(FLOAT_PATTERN)
+    invalid = texts.is_not_null() & parts.struct.field("2").is_null()
+    if invalid.any():
+        raise ValueError(f"'{texts.name}' holds values which are not numbers: {texts.filter(invalid).head(5).to_list()}")
+
+    integer_digits = parts.struct.field("2").fill_null("")
+    decimal_digits = parts.struct.field("3").fill_null("")
+    integer_count = integer_digits.str.len_chars().cast(pl.Int64).to_numpy()
+    decimal_count = np.minimum(decimal_digits.str.len_chars().cast(pl.Int64).to_numpy(),
+                               np.maximum(MAX_DIGITS - integer_count, 0))
+    exponent = (np.maximum(integer_count - MAX_DIGITS, 0) - decimal_count
+                + parts.struct.field("4").fill_null("0").cast(pl.Int64).to_numpy())
+
+    digits = (integer_digits + decimal_digits).str.slice(0, MAX_DIGITS)
+    digit_count = digits.str.len_chars().cast(pl.Int64).to_numpy()
+    # One row of MAX_DIGITS ASCII digits per value
+    digits = np.frombuffer("".join(digits.str.pad_end(MAX_DIGITS, "0").to_list()).encode(), dtype=np.uint8)
+    digits = digits.reshape(-1, MAX_DIGITS) - ord("0")
+    number = np.zeros(len(texts))
+    for position in range(MAX_DIGITS):
+        number = np.where(position < digit_count, number * 10.0 + digits[:, position], number)
+
+    number = np.where((parts.struct.field("1") == "-").to_numpy(), -number, number)
+    with np.errstate(over="ignore"):
+        number = np.where(exponent > 0, number * POWERS_OF_TEN[np.clip(exponent, 0, 308)],
+                          number / POWERS_OF_TEN[np.clip(-exponent, 0, 308)])
+    number = np.where(texts.is_null().to_numpy(), np.nan, number)
+    _check_floats(texts, number)
+    return pl.Series(texts.name, number)
+
+
+def _check_floats(texts, numbers):
+    """
+    Compares the values parsed by _parse_floats for a sample of texts with those of pd.read_csv,
+    so that a pandas version parsing them differently stops the run instead of changing the ids.
+    """
+    positions = np.flatnonzero(texts.is_not_null().to_numpy())
+    positions = positions[::max(1, len(positions) // CHECKED_FLOATS)]
+    if not len(positions):
+        return
+    sample = texts.gather(positions).str.strip_chars().to_list()
+    expected = pd.read_csv(io.StringIO("\n".join(sample)), header=None, names=["value"], dtype="float64",
+                           na_filter=False, skip_blank_lines=False)["value"].to_numpy()
+    if not np.array_equal(expected, numbers[positions]):
+        mismatch = np.flatnonzero(expected != numbers[positions])[0]
+        raise ValueError(f"'{texts.name}': '{sample[mismatch]}' is parsed as {numbers[positions][mismatch]!r} by the 'polars' "
+                         f"engine and {expected[mismatch]!r} by pandas {pd.__version__}, use ETL_TRANSFORM_ENGINE=pandas")
+
+
+def _round_amounts(amounts):
+    # Rounded by numpy as with the pandas engine: polars rounds the exact decimal value of the float,
+    # numpy rounds the value times 100 (e.g. 61.295 gives 61.29 with polars, 61.3 with numpy)
+    return pl.Series(amounts.name, np.round(amounts.to_numpy(), 2))
+
+
+def clean_plan(csv_path):
+    """
+    The steps of ETLPipeline.clean() as a lazy query, in the same order: full-row deduplication,
+    title-cased names, deduplication without Age, billing normalization and patient keys (hashed
+    afterwards, polars has no sha256). Dates and amounts are parsed as they are read, as pd.read_csv does.
+
+    Returns:
+        The lazy query of the cleaned rows (with their source row number and patient key), and the lazy
+        queries of the distinct values of each category column before the second deduplication, which
+        become the pandas categories.
+    """
+    unknown = [col for col in config.PATIENT_KEYS if config.SOURCE_SCHEMA.get(col) not in TEXT_DTYPES]
+    if unknown:
+        raise ValueError(f"The 'polars' transform engine builds patient keys from text columns only, not {unknown}")
+
+    rows = pl.scan_csv(
+        csv_path,
+        schema_overrides={col: POLARS_DTYPES[dtype] for col, dtype in config.SOURCE_SCHEMA.items()},
+        row_index_name=ROW_INDEX,
+        # Same missing value markers as the pandas engine ('NA', 'n/a', ...)
+        null_values=config.SOURCE_NA_VALUES,
+    ).select(ROW_INDEX, *config.SOURCE_SCHEMA)
+
+    rows = (
+        rows
+        .with_columns(pl.col(col).str.strptime(pl.Datetime("ns"), config.SOURCE_DATE_FORMAT) for col in _date_columns())
+        .with_columns(pl.col(col).map_batches(_parse_floats, return_dtype=pl.Float64)
+                      for col, dtype in config.SOURCE_SCHEMA.items() if dtype == "float64")
+        .unique(subset=list(config.SOURCE_SCHEMA), keep="first", maintain_order=True)
+        # Same result as str.title(): every letter following a non-letter is upper-cased
+        .with_columns(pl.col("Name").str.to_titlecase())
+    )
+    categories = [rows.select(pl.col(col).drop_nulls().unique().sort()) for col in _category_columns()]
+
+    rows = (
+        rows
+        .unique(subset=sorted(config.HOSPITALIZATION_KEYS - {"Age"}), keep="first", maintain_order=True)
+        .with_columns(
+            (pl.col("Billing Amount") < 0).alias("is_billing_amount_imputed"),
+            pl.col("Billing Amount").abs().map_batches(_round_amounts, return_dtype=pl.Float64),
+            pl.concat_str([pl.col(col).fill_null("nan") for col in sorted(config.PATIENT_KEYS)], separator="|").alias(PATIENT_KEY),
+        )
+    )
+    return rows, categories
+
+
+def to_pandas(frame, categories):
+    """
+    The collected rows as the DataFrame of the pandas engine: same columns and dtypes, source row
+    numbers as index, categories sorted like those of pd.read_csv and astype("category").
+    """
+    columns = {}
+    for col in [*config.SOURCE_SCHEMA, "is_billing_amount_imputed"]:
+        if col in categories:
+            values = categories[col].to_series()
+            codes = frame[col].cast(pl.Enum(values)).to_physical().fill_null(-1).cast(pl.Int32).to_numpy()
+            columns[col] = pd.Categorical.from_codes(codes, categories=pd.Index(values.to_list(), dtype=object))
+        elif frame[col].dtype == pl.String:
+            # Missing texts are NaN, as read by pd.read_csv, not None: they are part of the ids ('nan')
+            values = frame[col].to_numpy().copy()
+            values[frame[col].is_null().to_numpy()] = np.nan
+            columns[col] = values
+        elif frame[col].dtype.is_integer():
+            # Nullable ints, as read by pd.read_csv with the 'Int8'/'Int16' dtypes of the schema
+            columns[col] = pd.arrays.IntegerArray(frame[col].fill_null(0).to_numpy(), frame[col].is_null().to_numpy())
+        else:
+            columns[col] = frame[col].to_numpy()
+    return pd.DataFrame(columns, index=pd.Index(frame[ROW_INDEX].cast(pl.Int64).to_numpy()))
+
+
+def clean_file(csv_path, report, workers=0):
+    """
+    Extract and clean() of a whole file with polars, multi-threaded (POLARS_MAX_THREADS threads),
+    with the same result as the pandas engine. Column names are not normalized yet.
+
+    Args:
+        csv_path: The source CSV file.
+        report (RunReport): Report receiving the timings of the stages.
+        workers (int): Number of processes hashing the patient ids.
+
+    Returns:
+        The cleaned DataFrame, and the parsed table of its distinct names.
+    """
+    logger.info(f"Extracting and cleaning data from : {csv_path} (polars, {pl.thread_pool_size()} threads)")
+    rows, category_queries = clean_plan(csv_path)
+
+    with report.stage("polars_clean") as stage:
+        # Collected together: the scan and the first steps are shared by the queries
+        frame, *distinct_values = pl.collect_all([rows, *category_queries])
+        stage.output(len(frame))
+    categories = dict(zip(_category_columns(), distinct_values))
+    logger.info(f"Data cleaned: {len(frame)} lines kept.")
+
+    with report.stage("patient_ids", len(frame)) as stage:
+        patient_ids = hash_keys(frame[PATIENT_KEY].to_list(), workers=workers)
+        stage.output(len(patient_ids))
+
+    with report.stage("to_pandas", len(frame)) as stage:
+        df = to_pandas(frame, categories)
+        df["Patient Id"] = np.array(patient_ids, dtype=object)
+        stage.output(df)
+    return df, parse_name_table(df["Name"].cat.categories)
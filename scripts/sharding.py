@@ -0,0 +1,62 @@
+import logging
+
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+HASHED_ID_KEY = {"_id": "hashed"}
+
+
+def list_shards(client):
+    """Ids of the shards of the cluster, a ValueError when the client is not connected to a mongos."""
+    try:
+        return [shard["_id"] for shard in client.admin.command("listShards")["shards"]]
+    except OperationFailure as e:
+        raise ValueError(f"Pre-splitting chunks needs a sharded cluster (mongos): {e}")
+
+
+def _chunks(client, namespace):
+    """Chunks of a collection ordered by range, from the config database (by uuid since MongoDB 5.0)."""
+    config_db = client["config"]
+    collection = config_db["collections"].find_one({"_id": namespace})
+    criteria = {"$or": [{"ns": namespace}, {"uuid": collection.get("uuid")}]} if collection else {"ns": namespace}
+    return list(config_db["chunks"].find(criteria).sort("min", 1))
+
+
+def presplit_hashed(client, database, collection_names, chunks_per_shard=2):
+    """
+    Shards empty collections on a hashed _id, split into chunks_per_shard chunks per shard, and moves
+    the chunks so that consecutive ranges of hashed values go to the shards in turn. Writes of
+    documents with random-looking ids (our sha256 prefixes) are then spread over every shard from
+    the first batch, instead of filling one chunk until the balancer splits and moves it.
+
+    Args:
+        client (MongoClient): A client connected to a mongos.
+        database (str): The database of the collections.
+        collection_names (list): The (dropped or empty) collections to shard, those already sharded are left as they are.
+        chunks_per_shard (int): Initial chunks per shard.
+    """
+    shards = list_shards(client)
+    client.admin.command("enableSharding", database)
+    for name in collection_names:
+        namespace = f"{database}.{name}"
+        sharded = client["config"]["collections"].find_one({"_id": namespace, "dropped": {"$ne": True}})
+        if sharded is not None:
+            logger.info(f"   ➖ '{namespace}' is already sharded on {sharded.get('key')}.")
+            continue
+        client.admin.command("shardCollection", namespace, key=HASHED_ID_KEY,
+                             numInitialChunks=chunks_per_shard * len(shards))
+
+        moved = 0
+        chunks = _chunks(client, namespace)
+        for number, chunk in enumerate(chunks):
+            target = shards[number % len(shards)]
+            if chunk["shard"] == target:
+                continue
+            try:
+                client.admin.command("moveChunk", namespace, bounds=[chunk["min"], chunk["max"]], to=target)
+                moved += 1
+            except OperationFailure as e:
+                # The balancer may have moved it meanwhile, the load works with any placement
+                logger.warning(f"   ⚠️ Chunk {chunk['min']} of '{namespace}' not moved to '{target}': {e}")
+        logger.info(f"   ✅ '{namespace}' sharded on a hashed _id: {len(chunks)} chunks over {len(shards)} shards, {moved} moved.")
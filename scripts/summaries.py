@@ -0,0 +1,107 @@
+import threading
+
+import pandas as pd
+
+AGGREGATIONS = {"sum", "count", "mean", "min", "max"}
+
+# Fields computed from the cleaned columns, usable in the rollup definitions
+DERIVED_FIELDS = {
+    "admission_month": lambda df: df["date_of_admission"].dt.to_period("M"),
+    "length_of_stay_days": lambda df: (df["discharge_date"] - df["date_of_admission"]).dt.days,
+}
+
+
+class SummaryBuilder:
+    """
+    Rollups of the cleaned hospitalizations (e.g. billing per medical condition), declared in
+    config.SUMMARIES. Every chunk of rows is reduced to partial sums, counts, minimums and
+    maximums per group, merged with those of the previous chunks, so that the result does not
+    depend on how the file was split. Means are only computed at the end.
+    """
+
+    def __init__(self, definitions):
+        for name, definition in definitions.items():
+            unknown = {agg for aggs in definition.get("metrics", {}).values() for agg in aggs} - AGGREGATIONS
+            if unknown:
+                raise ValueError(f"Summary '{name}': unknown aggregations {unknown}, expected some of {AGGREGATIONS}")
+        self.definitions = definitions
+        self._partials = {}
+        # Chunks of the pipelined mode are summarized from several threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _partial_aggregations(metrics):
+        """Mergeable aggregations needed for the requested ones (mean = sum / count)."""
+        needed = {}
+        for field, aggs in metrics.items():
+            for agg in aggs:
+                for partial in (("sum", "count") if agg == "mean" else (agg,)):
+                    needed[f"{field}_{partial}"] = (field, partial)
+        return needed
+
+    def add(self, df):
+        """Summarizes a cleaned DataFrame (or chunk), with normalized column names."""
+        for name, definition in self.definitions.items():
+            group_by, metrics = definition["group_by"], definition.get("metrics", {})
+            fields = set(group_by) | set(metrics)
+            missing = fields - set(df.columns) - set(DERIVED_FIELDS)
+            if missing:
+                raise ValueError(f"Summary '{name}': unknown fields {missing}")
+
+            frame = df[[field for field in fields if field in df.columns]].assign(**{
+                field: derive(df) for field, derive in DERIVED_FIELDS.items() if field in fields
+            })
+            partial = frame.groupby(group_by, observed=True, sort=False).agg(
+                hospitalizations=(group_by[0], "size"), **self._partial_aggregations(metrics)
+            )
+            with self._lock:
+                self._partials[name] = self._merge(self._partials.get(name), partial, group_by)
+
+    @staticmethod
+    def _merge(current, partial, group_by):
+        if current is None:
+            return partial
+        merged = pd.concat([current, partial])
+        how = {}
+        for column in merged.columns:
+            agg = column.rsplit("_", 1)[-1]
+            # Counts (hospitalizations included) of both parts add up, as their sums do
+            how[column] = agg if agg in ("min", "max") else "sum"
+        return merged.groupby(level=list(range(len(group_by))), observed=True, sort=False).agg(how)
+
+    def documents(self):
+        """
+        One document per group and rollup, with the group value as _id (a sub-document when
+        grouping by several fields) for indexed point lookups.
+
+        Returns:
+            A dictionary where keys are rollup names and values are lists of documents.
+        """
+        documents = {}
+        for name, definition in self.definitions.items():
+            group_by, metrics = definition["group_by"], definition.get("metrics", {})
+            partial = self._partials.get(name)
+            if partial is None:
+                documents[name] = []
+                continue
+
+            result = pd.DataFrame({"hospitalizations": partial["hospitalizations"]}, index=partial.index)
+            for field, aggs in metrics.items():
+                for agg in aggs:
+                    if agg == "mean":
+                        # From the rounded sum: chunks add up in another order than a whole-file
+                        # groupby, the last digits of the sum (and the rounded mean) could differ
+                        values = partial[f"{field}_sum"].round(2) / partial[f"{field}_count"]
+                    else:
+                        values = partial[f"{field}_{agg}"]
+                    result[f"{field}_{agg}"] = values.round(2) if pd.api.types.is_float_dtype(values) else values
+
+            result = result.reset_index()
+            for field in group_by:
+                if isinstance(result[field].dtype, pd.PeriodDtype):
+                    result[field] = result[field].astype(str)
+            documents[name] = [
+                {"_id": record[group_by[0]] if len(group_by) == 1 else {field: record[field] for field in group_by}, **record}
+                for record in result.sort_values(group_by).to_dict(orient="records")
+            ]
+        return documents
@@ -0,0 +1,68 @@
+"""
+Parity of the vectorized ids (scripts/id_engine.py) with the per-row ids of the baseline,
+ETLPipeline._generate_hash_id([row[col] for col in columns]), on a cleaned frame with missing values
+in each key column (nullable Int8/Int16, category, datetime64 and text columns).
+
+Run from the project root: python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from config import config  # noqa: E402
+from scripts import id_engine  # noqa: E402
+from scripts.etl import ETLPipeline  # noqa: E402
+from scripts.id_engine import generate_hash_ids  # noqa: E402
+from notebooks_and_tests.bench_transform_engine import write_edge_cases  # noqa: E402
+from notebooks_and_tests.benchmark_pipeline import BenchmarkPipeline  # noqa: E402
+from notebooks_and_tests.synthetic_data import generate  # noqa: E402
+
+KEYS = sorted(config.PATIENT_KEYS | config.HOSPITALIZATION_KEYS)
+
+
+@pytest.fixture(scope="module")
+def cleaned(tmp_path_factory):
+    """Cleaned frame of an edge-case file where every key column has a few blank cells."""
+    folder = tmp_path_factory.mktemp("data")
+    generate(folder / "synthetic.csv", 3000)
+    write_edge_cases(folder / "synthetic.csv", folder / "edge_cases.csv")
+    source = pd.read_csv(folder / "edge_cases.csv", dtype=str, keep_default_na=False)
+    rng = np.random.default_rng(11)
+    for col in KEYS:
+        source.loc[rng.choice(len(source), 5, replace=False), col] = ""
+    source.to_csv(folder / "blank_keys.csv", index=False)
+
+    pipeline = BenchmarkPipeline(config, mongomock.MongoClient())
+    df = pipeline.clean(pipeline.extract(folder / "blank_keys.csv"))
+    return df, pipeline.column_mapping
+
+
+def per_row_ids(df, columns):
+    return [ETLPipeline._generate_hash_id([row[col] for col in columns]) for _, row in df.iterrows()]
+
+
+def test_every_key_column_has_missing_values(cleaned):
+    df, mapping = cleaned
+    columns = [mapping[key] for key in KEYS]
+    missing = df[columns].isna().sum()
+    assert (missing > 0).all(), missing[missing == 0].index.tolist()
+    assert {str(df[col].dtype) for col in columns} >= {"Int8", "Int16", "category", "datetime64[ns]"}
+
+
+@pytest.mark.parametrize("keys", [config.PATIENT_KEYS, config.HOSPITALIZATION_KEYS], ids=["patient", "hospitalization"])
+def test_ids_match_the_per_row_ids(cleaned, keys):
+    df, mapping = cleaned
+    # Same column order as ETLPipeline: patient ids from the sorted keys, hospitalization ids prefixed by patient_id
+    columns = [mapping[key] for key in sorted(keys)]
+    if keys is config.HOSPITALIZATION_KEYS:
+        columns = ["patient_id"] + columns
+    assert generate_hash_ids(df, columns).tolist() == per_row_ids(df, columns)
+
+
+def test_worker_processes_give_the_same_ids(cleaned, monkeypatch):
+    df, mapping = cleaned
+    columns = [mapping[key] for key in KEYS]
+    monkeypatch.setattr(id_engine, "MIN_ROWS_PER_WORKER", 500)
+    assert generate_hash_ids(df, columns, workers=2).equals(generate_hash_ids(df, columns))
@@ -0,0 +1,82 @@
+"""
+Resumable load (config.RESUMABLE_LOAD): the run after an interrupted load writes the same collections,
+and the batches already written by the interrupted run are neither built nor written again.
+
+Run from the project root: python -m pytest tests
+"""
+import math
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from mongomock.collection import Collection  # noqa: E402
+from pymongo.errors import AutoReconnect  # noqa: E402
+
+from config import config  # noqa: E402
+from scripts import etl  # noqa: E402
+from notebooks_and_tests.benchmark_pipeline import BenchmarkPipeline  # noqa: E402
+from notebooks_and_tests.synthetic_data import generate  # noqa: E402
+
+BATCH_SIZE = 100
+WRITTEN_BATCHES = 3
+
+
+@pytest.fixture
+def resumable(tmp_path, monkeypatch):
+    csv_path = tmp_path / "synthetic.csv"
+    generate(csv_path, 2000)
+    for name, value in {"LOAD_MODE": "full", "RESUMABLE_LOAD": True, "LOAD_BATCH_SIZE": BATCH_SIZE, "LOAD_WORKERS": 1,
+                        "CHUNK_SIZE": 0, "LOAD_PARTITIONS": 0, "BSON_ENCODE_WORKERS": 0, "TRANSFORM_ENGINE": "pandas",
+                        "CHECKPOINT_ENABLED": False, "SUMMARIES_ENABLED": False,
+                        "CHECKPOINT_DIR": tmp_path / "checkpoints", "REPORT_DIR": tmp_path / "reports"}.items():
+        monkeypatch.setattr(config, name, value)
+    return csv_path, mongomock.MongoClient()
+
+
+def count_calls(monkeypatch, module, name, counts):
+    function = getattr(module, name)
+
+    def counted(*args, **kwargs):
+        counts[name] = counts.get(name, 0) + 1
+        return function(*args, **kwargs)
+    monkeypatch.setattr(module, name, counted)
+
+
+@pytest.mark.parametrize("mode, builders", [
+    ("reference", ["patient_documents", "hospitalization_documents"]),
+    ("bucket", ["bucket_patient_documents", "bucket_documents"]),
+])
+def test_resume_builds_only_the_batches_not_written(resumable, monkeypatch, mode, builders):
+    csv_path, client = resumable
+    monkeypatch.setattr(config, "DATA_MODELLING_MODE", mode)
+    db = client[config.MONGO_DB]
+
+    # The connection drops while the 4th batch of patients is written
+    insert_many = Collection.insert_many
+    inserts = []
+
+    def failing_insert_many(collection, documents, *args, **kwargs):
+        inserts.append(collection.name)
+        if len(inserts) == WRITTEN_BATCHES + 1:
+            raise AutoReconnect("connection lost")
+        return insert_many(collection, documents, *args, **kwargs)
+    monkeypatch.setattr(Collection, "insert_many", failing_insert_many)
+    BenchmarkPipeline(config, client).run_etl(csv_path)
+    assert db[config.COLLECTION_PATIENTS].count_documents({}) == WRITTEN_BATCHES * BATCH_SIZE
+
+    monkeypatch.setattr(Collection, "insert_many", insert_many)
+    built = {}
+    for name in builders:
+        count_calls(monkeypatch, etl, name, built)
+    BenchmarkPipeline(config, client).run_etl(csv_path)
+
+    # Every patient is loaded once, and only the batches of patients not written were built
+    patients = db[config.COLLECTION_PATIENTS].count_documents({})
+    stays = db[config.COLLECTION_HOSPITALIZATIONS if mode == "reference" else config.COLLECTION_HOSPITALIZATION_BUCKETS]
+    assert patients == len(stays.distinct("patient_id"))
+    assert built[builders[0]] == math.ceil(patients / BATCH_SIZE) - WRITTEN_BATCHES
+    # None of the hospitalizations (buckets: one batch per batch of patients) had been written
+    stay_rows = stays.count_documents({}) if mode == "reference" else patients
+    assert built[builders[1]] == math.ceil(stay_rows / BATCH_SIZE)
+    assert db[config.LOAD_CHECKPOINT_COLLECTION].count_documents({}) == 0
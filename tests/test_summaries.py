@@ -0,0 +1,33 @@
+"""
+Rollups (scripts/summaries.py) must not depend on how the file is split into chunks.
+
+Run from the project root: python -m pytest tests
+"""
+import warnings
+
+import pandas as pd
+
+from scripts.summaries import SummaryBuilder
+
+
+def test_chunks_give_the_same_rollups_as_the_whole_frame():
+    conditions = pd.CategoricalDtype(["Asthma", "Cancer", "Diabetes", "Obesity"])
+    hospitals = pd.CategoricalDtype(["North", "South", "West"])
+    df = pd.DataFrame({
+        "medical_condition": pd.Series(["Asthma", "Cancer", "Asthma", "Diabetes", "Asthma", "Cancer"], dtype=conditions),
+        "hospital": pd.Series(["North", "South", "North", "West", "South", "South"], dtype=hospitals),
+        "billing_amount": [100.0, 250.5, 80.25, 1200.0, 42.0, 310.0],
+    })
+    definitions = {"billing": {"group_by": ["medical_condition", "hospital"], "metrics": {"billing_amount": ["mean", "max"]}}}
+
+    whole = SummaryBuilder(definitions)
+    whole.add(df)
+    chunked = SummaryBuilder(definitions)
+    with warnings.catch_warnings():
+        # Grouping the merged partials by categorical levels must keep the observed groups only
+        warnings.simplefilter("error", FutureWarning)
+        for start in range(0, len(df), 2):
+            chunked.add(df.iloc[start:start + 2])
+
+    assert chunked.documents() == whole.documents()
+    assert len(whole.documents()["billing"]) == 4
@@ -0,0 +1,64 @@
+"""
+Parity of the transform engines (config.TRANSFORM_ENGINE): extract + clean of the same file with
+pandas and with polars must give the same DataFrame, down to the type of its missing values, and
+therefore the same documents and ids.
+
+Run from the project root: python -m pytest tests
+"""
+import bson
+import pandas as pd
+import pytest
+
+pytest.importorskip("polars")
+mongomock = pytest.importorskip("mongomock")
+
+from config import config  # noqa: E402
+from notebooks_and_tests.bench_transform_engine import write_edge_cases  # noqa: E402
+from notebooks_and_tests.benchmark_pipeline import BenchmarkPipeline  # noqa: E402
+from notebooks_and_tests.synthetic_data import generate  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def synthetic_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp("data") / "synthetic.csv"
+    generate(path, 5000)
+    return path
+
+
+@pytest.fixture(scope="module")
+def edge_cases_csv(synthetic_csv):
+    path = synthetic_csv.with_name("edge_cases.csv")
+    write_edge_cases(synthetic_csv, path)
+    return path
+
+
+def clean_with(engine, csv_path, monkeypatch):
+    monkeypatch.setattr(config, "TRANSFORM_ENGINE", engine)
+    pipeline = BenchmarkPipeline(config, mongomock.MongoClient())
+    return pipeline, pipeline.extract_clean(csv_path)
+
+
+@pytest.mark.parametrize("source", ["synthetic_csv", "edge_cases_csv"])
+def test_polars_cleans_like_pandas(source, request, monkeypatch):
+    csv_path = request.getfixturevalue(source)
+    expected_pipeline, expected = clean_with("pandas", csv_path, monkeypatch)
+    pipeline, df = clean_with("polars", csv_path, monkeypatch)
+
+    pd.testing.assert_frame_equal(df, expected, check_exact=True, check_categorical=True)
+    # assert_frame_equal takes None for NaN: missing values must be of the same type as well
+    pd.testing.assert_frame_equal(df.map(type), expected.map(type))
+    pd.testing.assert_frame_equal(pipeline.name_table, expected_pipeline.name_table, check_exact=True)
+    assert pipeline.column_mapping == expected_pipeline.column_mapping
+
+
+@pytest.mark.parametrize("mode", ["embedding", "reference", "bucket"])
+def test_polars_builds_the_same_documents(edge_cases_csv, mode, monkeypatch):
+    documents = {}
+    for engine in ["pandas", "polars"]:
+        pipeline, df = clean_with(engine, edge_cases_csv, monkeypatch)
+        documents[engine] = pipeline.build_documents(df, mode)
+
+    for collection, expected in documents["pandas"].items():
+        built = documents["polars"][collection]
+        assert [document["_id"] for document in built] == [document["_id"] for document in expected]
+        assert [bson.encode(document) for document in built] == [bson.encode(document) for document in expected]